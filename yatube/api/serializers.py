@@ -0,0 +1,51 @@
+def _timestamp(value):
+    return value.isoformat() if value else None
+
+
+POST_FIELDS: dict = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': lambda post: post.image.url if post.image else None,
+    'pub_date': lambda post: _timestamp(post.pub_date),
+    'updated': lambda post: _timestamp(post.updated),
+}
+GROUP_FIELDS: dict = {
+    'id': lambda group: group.pk,
+    'slug': lambda group: group.slug,
+    'title': lambda group: group.title,
+    'description': lambda group: group.description,
+}
+COMMENT_FIELDS: dict = {
+    'id': lambda comment: comment.pk,
+    'post': lambda comment: comment.post_id,
+    'author': lambda comment: comment.author.username,
+    'text': lambda comment: comment.text,
+    'pub_date': lambda comment: _timestamp(comment.pub_date),
+}
+FOLLOW_FIELDS: dict = {
+    'id': lambda follow: follow.pk,
+    'user': lambda follow: follow.user.username,
+    'author': lambda follow: follow.author.username,
+}
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def select_fields(request, available):
+    """Поля из ?fields=id,text; без параметра — все поля ресурса."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return available
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}')
+    return {name: available[name] for name in names}
+
+
+def serialize(obj, fields):
+    return {name: getter(obj) for name, getter in fields.items()}
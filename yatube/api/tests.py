@@ -0,0 +1,153 @@
+import json
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+from posts.utils import POSTS_ON_PAGE
+
+POSTS_URL = reverse('api:post_list')
+GROUPS_URL = reverse('api:group_list')
+FOLLOWS_URL = reverse('api:follow_list')
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(author=self.user, group=self.group,
+                                        text='Тестовый пост')
+        self.POST_URL = reverse('api:post_detail',
+                                kwargs={'post_id': self.post.pk})
+        self.COMMENTS_URL = reverse('api:comment_list',
+                                    kwargs={'post_id': self.post.pk})
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def send(self, client, method, url, data):
+        return getattr(client, method)(url, json.dumps(data),
+                                       content_type='application/json')
+
+    def test_post_list_pages_by_cursor_and_selects_fields(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}')
+            for i in range(POSTS_ON_PAGE)
+        )
+        data = self.client.get(POSTS_URL, {'fields': 'id,author'}).json()
+        self.assertEqual(len(data['results']), POSTS_ON_PAGE)
+        self.assertEqual(set(data['results'][0]), {'id', 'author'})
+        self.assertIsNone(data['previous'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(data['results'][0]['author'], 'auth')
+        self.assertIsNone(data['next'])
+        response = self.client.get(POSTS_URL, {'fields': 'password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_post_list_filters_by_group(self):
+        Post.objects.create(author=self.user, text='Без группы')
+        data = self.client.get(POSTS_URL, {'group': self.group.slug}).json()
+        self.assertEqual([post['id'] for post in data['results']],
+                         [self.post.pk])
+        self.assertEqual(data['results'][0]['group'], self.group.slug)
+
+    def test_unchanged_post_returns_not_modified(self):
+        response = self.client.get(self.POST_URL)
+        self.assertFalse(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.POST_URL,
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.send(self.author_client, 'patch', self.POST_URL,
+                  {'text': 'Новый текст'})
+        response = self.client.get(self.POST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['text'], 'Новый текст')
+
+    def test_new_comment_changes_comments_etag(self):
+        etag = self.client.get(self.COMMENTS_URL)['ETag']
+        response = self.send(self.reader_client, 'post', self.COMMENTS_URL,
+                             {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertEqual(response.json()['author'], 'reader')
+        response = self.client.get(self.COMMENTS_URL,
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_create_edit_and_delete_post(self):
+        response = self.send(self.author_client, 'post', POSTS_URL,
+                             {'text': 'Из API', 'group': self.group.slug})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        post = Post.objects.get(pk=response.json()['id'])
+        self.assertEqual(post.group, self.group)
+        url = reverse('api:post_detail', kwargs={'post_id': post.pk})
+        response = self.send(self.reader_client, 'patch', url,
+                             {'text': 'Чужой'})
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = self.send(self.author_client, 'patch', url,
+                             {'group': None})
+        self.assertIsNone(response.json()['group'])
+        self.assertEqual(response.json()['text'], 'Из API')
+        response = self.author_client.delete(url)
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+
+    def test_writes_require_login(self):
+        response = self.send(self.client, 'post', POSTS_URL,
+                             {'text': 'Аноним'})
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        response = self.client.get(FOLLOWS_URL)
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_groups(self):
+        data = self.client.get(GROUPS_URL).json()
+        self.assertEqual(data['results'][0]['slug'], self.group.slug)
+        response = self.client.get(
+            reverse('api:group_detail', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_follow_and_unfollow(self):
+        response = self.send(self.reader_client, 'post', FOLLOWS_URL,
+                             {'author': 'auth'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        response = self.send(self.reader_client, 'post', FOLLOWS_URL,
+                             {'author': 'auth'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.reader_client.get(FOLLOWS_URL)
+        self.assertIn('Cookie', response['Vary'])
+        self.assertEqual(response.json()['results'][0]['author'], 'auth')
+        response = self.reader_client.delete(
+            reverse('api:follow_detail', kwargs={'username': 'auth'}))
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_head_is_allowed_only_with_get(self):
+        Follow.objects.create(user=self.reader, author=self.user)
+        url = reverse('api:follow_detail', kwargs={'username': 'auth'})
+        response = self.reader_client.head(url)
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+        self.assertEqual(response['Allow'], 'DELETE')
+        self.assertTrue(Follow.objects.exists())
+        response = self.client.head(url)
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+        response = self.client.head(POSTS_URL)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_malformed_json_is_bad_request(self):
+        response = self.author_client.post(POSTS_URL, '{',
+                                           content_type='application/json')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.send(self.author_client, 'post', POSTS_URL, [])
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
@@ -0,0 +1,264 @@
+import json
+from functools import wraps
+from http import HTTPStatus
+
+from django.core import signing
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.vary import vary_on_cookie
+
+from posts.cache import get_versions
+from posts.conditional import conditional
+from posts.groups import GROUPS_NAMESPACE
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import COMMENTS_ON_PAGE, POSTS_ON_PAGE, CursorPaginator
+
+from .serializers import (COMMENT_FIELDS, FOLLOW_FIELDS, GROUP_FIELDS,
+                          POST_FIELDS, FieldsError, select_fields,
+                          serialize)
+
+SAFE_METHODS: tuple = ('GET', 'HEAD')
+# Своя соль: курсор ленты постов не должен подходить к списку подписок.
+FOLLOWS_CURSOR_SALT: str = 'api.follows.cursor'
+
+
+class RequestDataError(Exception):
+    pass
+
+
+def error(status, detail, **extra):
+    return JsonResponse({'detail': detail, **extra}, status=status)
+
+
+def api_view(*methods):
+    """Разрешённые методы, JSON-ошибки и вход для изменяющих запросов.
+
+    HEAD разрешён только вместе с GET: иначе он выполнил бы тело
+    изменяющего view в обход проверки входа.
+    """
+    allowed = (*methods, 'HEAD') if 'GET' in methods else methods
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = error(HTTPStatus.METHOD_NOT_ALLOWED,
+                                 'Метод не поддерживается')
+                response['Allow'] = ', '.join(allowed)
+                return response
+            if (request.method not in SAFE_METHODS
+                    and not request.user.is_authenticated):
+                return error(HTTPStatus.UNAUTHORIZED, 'Требуется вход')
+            try:
+                return view(request, *args, **kwargs)
+            except FieldsError as exc:
+                return error(HTTPStatus.BAD_REQUEST, str(exc))
+            except RequestDataError as exc:
+                return error(HTTPStatus.BAD_REQUEST, str(exc))
+            except Http404:
+                return error(HTTPStatus.NOT_FOUND, 'Не найдено')
+        return wrapper
+    return decorator
+
+
+def request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or '{}')
+        except ValueError:
+            raise RequestDataError('Некорректный JSON')
+        if not isinstance(data, dict):
+            raise RequestDataError('Ожидается объект JSON')
+        return data
+    return request.POST.dict()
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def page_response(request, page, fields, next_cursor, previous_cursor=None):
+    return JsonResponse({
+        'results': [serialize(obj, fields) for obj in page],
+        'next': page_link(request, next_cursor),
+        'previous': page_link(request, previous_cursor),
+    })
+
+
+def get_or_404(queryset, **lookup):
+    obj = queryset.filter(**lookup).first()
+    if obj is None:
+        raise Http404
+    return obj
+
+
+def with_group_id(data):
+    # В API группа задаётся слагом, а форма ждёт первичный ключ.
+    if data.get('group'):
+        data['group'] = get_or_404(Group.objects, slug=data['group']).pk
+    return data
+
+
+def listed_posts(request):
+    posts = Post.objects.for_listing()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return posts
+
+
+def posts_state(request):
+    # Валидаторы — версии пространств имён кеша страниц: их поднимают те же
+    # сигналы, включая удаления, а проверка обходится без запросов к БД.
+    return tuple(get_versions(['posts']))
+
+
+@api_view('GET', 'POST')
+@conditional(posts_state)
+def post_list(request):
+    if request.method == 'POST':
+        data = with_group_id(request_data(request))
+        form = PostForm(data, files=request.FILES or None)
+        if not form.is_valid():
+            return error(HTTPStatus.BAD_REQUEST, 'Ошибка в данных',
+                         errors=form.errors)
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+        return JsonResponse(serialize(post, POST_FIELDS),
+                            status=HTTPStatus.CREATED)
+    fields = select_fields(request, POST_FIELDS)
+    page = CursorPaginator(listed_posts(request), POSTS_ON_PAGE).cursor_page(
+        request.GET.get('cursor'))
+    return page_response(request, page, fields, page.next_cursor,
+                         page.previous_cursor)
+
+
+def post_state(request, post_id):
+    return tuple(get_versions(['posts', f'post:{post_id}']))
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+@conditional(post_state)
+def post_detail(request, post_id):
+    post = get_or_404(Post.objects.for_listing(), pk=post_id)
+    if request.method == 'GET':
+        return JsonResponse(
+            serialize(post, select_fields(request, POST_FIELDS)))
+    if post.author_id != request.user.pk:
+        return error(HTTPStatus.FORBIDDEN, 'Изменять пост может только автор')
+    if request.method == 'DELETE':
+        post.delete()
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+    post = Post.objects.get(pk=post_id)
+    data = {'text': post.text, 'group': post.group_id}
+    data.update(with_group_id(request_data(request)))
+    form = PostForm(data, instance=post)
+    if not form.is_valid():
+        return error(HTTPStatus.BAD_REQUEST, 'Ошибка в данных',
+                     errors=form.errors)
+    return JsonResponse(serialize(form.save(), POST_FIELDS))
+
+
+def comments_state(request, post_id):
+    return tuple(get_versions([f'post:{post_id}']))
+
+
+@api_view('GET', 'POST')
+@conditional(comments_state)
+def comment_list(request, post_id):
+    post = get_or_404(Post.objects.only('pk'), pk=post_id)
+    if request.method == 'POST':
+        form = CommentForm(request_data(request))
+        if not form.is_valid():
+            return error(HTTPStatus.BAD_REQUEST, 'Ошибка в данных',
+                         errors=form.errors)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.save()
+        return JsonResponse(serialize(comment, COMMENT_FIELDS),
+                            status=HTTPStatus.CREATED)
+    fields = select_fields(request, COMMENT_FIELDS)
+    page = CursorPaginator(
+        Comment.objects.for_listing().filter(post_id=post_id),
+        COMMENTS_ON_PAGE, descending=False,
+    ).cursor_page(request.GET.get('cursor'))
+    return page_response(request, page, fields, page.next_cursor,
+                         page.previous_cursor)
+
+
+def groups_state(request, slug=None):
+    return tuple(get_versions([GROUPS_NAMESPACE]))
+
+
+@api_view('GET')
+@conditional(groups_state)
+def group_list(request):
+    fields = select_fields(request, GROUP_FIELDS)
+    return JsonResponse({'results': [
+        serialize(group, fields) for group in Group.objects.order_by('title')
+    ]})
+
+
+@api_view('GET')
+@conditional(groups_state)
+def group_detail(request, slug):
+    group = get_or_404(Group.objects, slug=slug)
+    return JsonResponse(serialize(group, select_fields(request,
+                                                       GROUP_FIELDS)))
+
+
+def follows_state(request):
+    if not request.user.is_authenticated:
+        return None
+    return (request.user.pk,
+            *get_versions([f'follow:{request.user.pk}']))
+
+
+@vary_on_cookie
+@api_view('GET', 'POST')
+@conditional(follows_state)
+def follow_list(request):
+    if not request.user.is_authenticated:
+        return error(HTTPStatus.UNAUTHORIZED, 'Требуется вход')
+    if request.method == 'POST':
+        username = request_data(request).get('author')
+        author = get_or_404(User.objects, username=username)
+        if author == request.user:
+            return error(HTTPStatus.BAD_REQUEST,
+                         'Нельзя подписаться на себя')
+        follow, created = Follow.objects.get_or_create(user=request.user,
+                                                       author=author)
+        return JsonResponse(
+            serialize(follow, FOLLOW_FIELDS),
+            status=HTTPStatus.CREATED if created else HTTPStatus.OK,
+        )
+    fields = select_fields(request, FOLLOW_FIELDS)
+    rows = Follow.objects.filter(user=request.user).select_related(
+        'user', 'author').order_by('pk')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            rows = rows.filter(pk__gt=signing.loads(
+                cursor, salt=FOLLOWS_CURSOR_SALT))
+        except signing.BadSignature:
+            pass
+    rows = list(rows[:POSTS_ON_PAGE + 1])
+    next_cursor = None
+    if len(rows) > POSTS_ON_PAGE:
+        rows = rows[:POSTS_ON_PAGE]
+        next_cursor = signing.dumps(rows[-1].pk, salt=FOLLOWS_CURSOR_SALT)
+    return page_response(request, rows, fields, next_cursor)
+
+
+@api_view('DELETE')
+def follow_detail(request, username):
+    Follow.objects.filter(user=request.user,
+                          author__username=username).delete()
+    return HttpResponse(status=HTTPStatus.NO_CONTENT)
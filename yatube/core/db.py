@@ -0,0 +1,105 @@
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE: str = 'primary_db'
+# Сессии пишутся почти в каждом запросе: прочитанная с отстающей реплики
+# сессия считается несуществующей, и пользователь разлогинивается.
+PRIMARY_APPS: tuple = ('sessions',)
+
+_state = threading.local()
+
+
+def _current_replica():
+    if getattr(_state, 'wrote', False):
+        return None
+    return getattr(_state, 'replica', None)
+
+
+class ReplicaRouter:
+    """Чтения безопасных запросов — с реплик, всё остальное — с основной БД."""
+
+    def db_for_read(self, model, **hints):
+        replica = _current_replica()
+        if replica and model._meta.app_label not in PRIMARY_APPS:
+            _state.replica_read = True
+            return replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # После записи запрос дочитывает данные с основной БД, иначе
+        # отстающая реплика вернёт то, чего ещё не видела.
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Одна реплика на весь запрос, чтобы страница не собиралась из
+        # снимков разной свежести.
+        if (settings.DATABASE_REPLICAS and request.method in ('GET', 'HEAD')
+                and STICKY_COOKIE not in request.COOKIES):
+            _state.replica = random.choice(settings.DATABASE_REPLICAS)
+        else:
+            _state.replica = None
+        _state.wrote = _state.replica_read = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.replica, _state.wrote = None, False
+            _state.replica_read = False
+        if wrote and settings.DATABASE_REPLICAS:
+            # Пока реплики догоняют основную БД, автор изменений читает
+            # с неё же и видит свои записи.
+            response.set_cookie(STICKY_COOKIE, '1',
+                                max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True)
+        return response
+
+
+@contextmanager
+def primary():
+    """Чтения внутри блока идут в основную БД.
+
+    Нужен там, где прочитанное сохраняется в кеш под уже поднятой версией:
+    отстающая реплика записала бы туда данные до изменения.
+    """
+    replica = getattr(_state, 'replica', None)
+    _state.replica = None
+    try:
+        yield
+    finally:
+        _state.replica = replica
+
+
+def reset_replica_reads():
+    _state.replica_read = False
+
+
+def replica_was_read():
+    """Читал ли запрос с реплики после последнего reset_replica_reads."""
+    return getattr(_state, 'replica_read', False)
+
+
+def use_primary(view):
+    """Весь запрос, включая GET, обслуживается основной БД."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with primary():
+            return view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,81 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+from posts.management.commands.bench_views import percentile
+
+MODES = {
+    'новое соединение': 0,
+    'постоянное соединение': None,
+}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает задержку запросов с новым соединением с БД на каждый '
+            'запрос и с постоянным соединением (CONN_MAX_AGE).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов в каждом режиме')
+        parser.add_argument('--url', default='/', help='Адрес для замера')
+
+    def measure(self, client, url, requests, conn_max_age):
+        connection = connections[DEFAULT_DB_ALIAS]
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        connection.close()
+        connects = []
+        timings = []
+
+        def on_connect(sender, connection, **kwargs):
+            connects.append(connection.alias)
+
+        connection_created.connect(on_connect)
+        try:
+            for _ in range(requests):
+                # Тестовый клиент не закрывает соединения между запросами,
+                # поэтому здесь это делается так же, как в WSGI-сервере.
+                close_old_connections()
+                # Без очистки страницу отдаст кеш и запрос не дойдёт до БД.
+                cache.clear()
+                start = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+                close_old_connections()
+        finally:
+            connection_created.disconnect(on_connect)
+        return {
+            'mean_ms': sum(timings) / len(timings),
+            'p95_ms': percentile(timings, 0.95),
+            'connections': len(connects),
+        }
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        configured = connection.settings_dict['CONN_MAX_AGE']
+        client = Client()
+        # Первый запрос прогревает кеши шаблонов и URL.
+        client.get(options['url'])
+        results = {}
+        try:
+            for mode, conn_max_age in MODES.items():
+                results[mode] = self.measure(
+                    client, options['url'], options['requests'], conn_max_age
+                )
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = configured
+            connection.close()
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:<24} среднее {result["mean_ms"]:7.2f} мс  '
+                f'p95 {result["p95_ms"]:7.2f} мс  '
+                f'соединений {result["connections"]}'
+            )
+        fresh, persistent = results.values()
+        self.stdout.write(self.style.SUCCESS(
+            'Открытие соединения стоит ~'
+            f'{fresh["mean_ms"] - persistent["mean_ms"]:.2f} мс на запрос'
+        ))
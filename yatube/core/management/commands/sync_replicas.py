@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную БД SQLite в файлы реплик. Нужна для '
+            'локальной проверки чтения с реплик.')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: YATUBE_DB_REPLICAS')
+        databases = settings.DATABASES
+        for alias in (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS):
+            if databases[alias]['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f'{alias}: поддерживается только SQLite')
+        source = sqlite3.connect(databases[DEFAULT_DB_ALIAS]['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                target = sqlite3.connect(databases[alias]['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f'{alias} обновлена'))
+        finally:
+            source.close()
@@ -0,0 +1,151 @@
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils import timezone
+
+logger = logging.getLogger('core.profiler')
+
+_state = threading.local()
+_buffer_lock = threading.Lock()
+_buffer = deque(maxlen=settings.PROFILER_BUFFER_SIZE)
+_original_render = Template.render
+_patch_lock = threading.Lock()
+_patch_users = 0
+
+
+def _timed_render(self, *args, **kwargs):
+    profile = getattr(_state, 'profile', None)
+    if profile is None:
+        return _original_render(self, *args, **kwargs)
+    started = time.perf_counter()
+    try:
+        return _original_render(self, *args, **kwargs)
+    finally:
+        profile.template_time += time.perf_counter() - started
+
+
+@contextmanager
+def _template_timing():
+    """Подменяет Template.render только на время профилируемых запросов.
+
+    Сигнал template_rendered отправляется лишь в тестах, поэтому время
+    шаблонов меряется обёрткой. Пока идёт хотя бы один замер, она стоит
+    для всех потоков, но непрофилируемым запросам стоит одну проверку.
+    """
+    global _patch_users
+    with _patch_lock:
+        if not _patch_users:
+            Template.render = _timed_render
+        _patch_users += 1
+    try:
+        yield
+    finally:
+        with _patch_lock:
+            _patch_users -= 1
+            if not _patch_users:
+                Template.render = _original_render
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.queries = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries[sql] += 1
+
+    def as_record(self, request, response):
+        match = request.resolver_match
+        return {
+            'time': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(
+                (time.perf_counter() - self.started) * 1000, 2),
+            'queries': sum(self.queries.values()),
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'duplicates': [
+                {'sql': sql, 'count': count}
+                for sql, count in self.queries.most_common()
+                if count > 1
+            ],
+        }
+
+
+def recent_requests():
+    with _buffer_lock:
+        return list(_buffer)
+
+
+def _percentile(values, share):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+def slow_endpoints(records, prefix='posts:', limit=20):
+    grouped = defaultdict(list)
+    for record in records:
+        if record['view'] and record['view'].startswith(prefix):
+            grouped[record['view']].append(record)
+    endpoints = []
+    for view, rows in grouped.items():
+        durations = [row['duration_ms'] for row in rows]
+        endpoints.append({
+            'view': view,
+            'requests': len(rows),
+            'p50_ms': _percentile(durations, 0.5),
+            'p95_ms': _percentile(durations, 0.95),
+            'max_ms': max(durations),
+            'queries': max(row['queries'] for row in rows),
+            'db_ms': round(sum(row['db_ms'] for row in rows) / len(rows), 2),
+            'template_ms': round(
+                sum(row['template_ms'] for row in rows) / len(rows), 2),
+            'duplicates': sum(len(row['duplicates']) for row in rows),
+        })
+    endpoints.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return endpoints[:limit]
+
+
+class RequestProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILER_SAMPLE_RATE:
+            return self.get_response(request)
+        profile = _state.profile = RequestProfile()
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(_template_timing())
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _state.profile = None
+        record = profile.as_record(request, response)
+        with _buffer_lock:
+            _buffer.append(record)
+        level = (logging.WARNING
+                 if record['duration_ms'] >= settings.PROFILER_SLOW_MS
+                 else logging.INFO)
+        logger.log(level, json.dumps(record, ensure_ascii=False))
+        return response
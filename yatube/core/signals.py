@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    # Django сам проверяет соединение, только если в нём уже были ошибки;
+    # разрыв со стороны БД иначе всплывёт исключением в первом запросе.
+    # Проверка стоит запроса к БД, поэтому проверяются только соединения,
+    # простоявшие дольше DATABASE_HEALTH_CHECK_IDLE секунд.
+    if not settings.DATABASE_HEALTH_CHECKS:
+        return
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        idle = now - getattr(connection, 'last_used', 0)
+        if (idle >= settings.DATABASE_HEALTH_CHECK_IDLE
+                and not connection.is_usable()):
+            connection.close()
+
+
+@receiver(request_finished)
+def remember_connections_use(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used = now
@@ -1,6 +1,35 @@
+import importlib
+import os
+import re
+import sqlite3
+from contextlib import nullcontext
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template.backends.django import Template
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+
+from posts.cache import cached_page, get_stats
+from posts.conditional import conditional
+from yatube.databases import database_from_env, replicas_from_env
+
+from . import db, profiler
+from .profiler import recent_requests
+
+User = get_user_model()
+PROFILER_PAGE = reverse('core:profiler')
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +37,220 @@ class ViewTestClass(TestCase):
         response = self.client.get('/unexisting_page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username='staff',
+                                              is_staff=True)
+
+    def test_request_is_recorded(self):
+        self.client.get(reverse('posts:index'))
+        record = recent_requests()[-1]
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], HTTPStatus.OK)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        # Обёртка рендера снимается после запроса.
+        self.assertIs(Template.render, profiler._original_render)
+
+    @override_settings(PROFILER_SAMPLE_RATE=0)
+    def test_sampling_can_skip_requests(self):
+        before = len(recent_requests())
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(len(recent_requests()), before)
+
+    @override_settings(PROFILER_SLOW_MS=0)
+    def test_profiler_page_only_for_staff(self):
+        user = User.objects.create_user(username='user')
+        self.client.force_login(user)
+        response = self.client.get(PROFILER_PAGE)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.client.force_login(self.staff)
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(PROFILER_PAGE)
+        self.assertContains(response, 'posts:index')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = db.ReplicaRouter()
+
+    def route(self, request, view=None):
+        def get_response(request):
+            if view is not None:
+                view(request)
+            return HttpResponse(self.router.db_for_read(User))
+        return db.ReplicaRoutingMiddleware(get_response)(request)
+
+    def test_safe_requests_read_from_replica(self):
+        response = self.route(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica')
+        self.assertNotIn(db.STICKY_COOKIE, response.cookies)
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_sessions_are_read_from_primary(self):
+        def get_response(request):
+            return HttpResponse(self.router.db_for_read(Session))
+        response = db.ReplicaRoutingMiddleware(get_response)(
+            self.factory.get('/'))
+        self.assertEqual(response.content, b'default')
+
+    def test_writes_go_to_primary_and_make_reader_sticky(self):
+        def write(request):
+            User.objects.create_user(username='author')
+        response = self.route(self.factory.post('/'), write)
+        self.assertEqual(response.content, b'default')
+        self.assertIn(db.STICKY_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[db.STICKY_COOKIE] = '1'
+        self.assertEqual(self.route(request).content, b'default')
+
+    def test_use_primary_pins_get_views(self):
+        view = db.use_primary(
+            lambda request: HttpResponse(self.router.db_for_read(User)))
+        response = db.ReplicaRoutingMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(response.content, b'default')
+
+    def test_pages_read_from_replica_are_not_cached(self):
+        cache.clear()
+        view = cached_page('replica-test')(
+            lambda request: HttpResponse(self.router.db_for_read(User)))
+        for _ in range(2):
+            request = self.factory.get('/')
+            request.user = AnonymousUser()
+            response = db.ReplicaRoutingMiddleware(view)(request)
+            self.assertEqual(response.content, b'replica')
+        self.assertEqual(get_stats()['misses'], 2)
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        request.COOKIES[db.STICKY_COOKIE] = '1'
+        db.ReplicaRoutingMiddleware(view)(request)
+        response = db.ReplicaRoutingMiddleware(view)(request)
+        self.assertEqual(response.content, b'default')
+        self.assertEqual(get_stats()['hits'], 1)
+
+    def test_replica_responses_have_no_etag(self):
+        view = conditional(lambda request: (1,))(
+            lambda request: HttpResponse(self.router.db_for_read(User)))
+        response = db.ReplicaRoutingMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica')
+        self.assertFalse(response.has_header('ETag'))
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def test_sqlite_path_is_relative_to_base_dir(self):
+        config = database_from_env({}, '/srv/yatube')
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], '/srv/yatube/db.sqlite3')
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+
+    def test_server_database_from_url(self):
+        config = database_from_env({
+            'YATUBE_DATABASE_URL': 'postgres://yatube:p%40ss@db:6432/yatube',
+            'YATUBE_DB_CONN_MAX_AGE': 'none',
+            'YATUBE_DB_POOLER': '1',
+        }, '/srv/yatube')
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(config['PASSWORD'], 'p@ss')
+        self.assertEqual((config['HOST'], config['PORT']), ('db', '6432'))
+        self.assertIsNone(config['CONN_MAX_AGE'])
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+        with self.assertRaises(ValueError):
+            database_from_env({'YATUBE_DATABASE_URL': 'oracle://db/x'}, '/')
+
+    def test_replicas_from_urls(self):
+        default = database_from_env({'YATUBE_DB_CONN_MAX_AGE': '30'}, '/')
+        replicas = replicas_from_env({
+            'YATUBE_DB_REPLICAS':
+                'postgres://reader@replica/yatube, sqlite:///replica.sqlite3',
+        }, '/srv/yatube', default)
+        self.assertEqual(list(replicas), ['replica1', 'replica2'])
+        self.assertEqual(replicas['replica1']['ENGINE'],
+                         'django.db.backends.postgresql')
+        self.assertEqual(replicas['replica1']['HOST'], 'replica')
+        self.assertEqual(replicas['replica1']['CONN_MAX_AGE'], 30)
+        self.assertEqual(replicas['replica2']['NAME'],
+                         '/srv/yatube/replica.sqlite3')
+        self.assertEqual(replicas['replica2']['TEST'], {'MIRROR': 'default'})
+
+
+class ConnectionSetupTests(TestCase):
+    def test_sqlite_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64 * 1024)
+
+    @override_settings(DATABASE_HEALTH_CHECK_IDLE=0)
+    def test_broken_connection_is_closed_before_request(self):
+        with mock.patch.object(connection, 'close') as close:
+            self.client.get(reverse('about:author'))
+            close.assert_not_called()
+            with mock.patch.object(connection, 'is_usable',
+                                   return_value=False):
+                self.client.get(reverse('about:author'))
+        close.assert_called_once()
+
+    @override_settings(DATABASE_HEALTH_CHECK_IDLE=60)
+    def test_recently_used_connection_is_not_checked(self):
+        self.client.get(reverse('about:author'))
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            self.client.get(reverse('about:author'))
+        is_usable.assert_not_called()
+
+
+class BenchConnectionsTests(TransactionTestCase):
+    def test_bench_connections(self):
+        out = StringIO()
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Django не закрывает соединение с тестовой базой в памяти:
+            # вместе с ним пропали бы таблицы. Базу держит открытой
+            # отдельное соединение, пока команда переоткрывает своё.
+            keeper = sqlite3.connect(connection.settings_dict['NAME'],
+                                     uri=True)
+            self.addCleanup(keeper.close)
+            closing = mock.patch.object(connection, 'is_in_memory_db',
+                                        return_value=False)
+        else:
+            closing = nullcontext()
+        with closing:
+            call_command('bench_connections', '--requests', '2', stdout=out)
+        connection.ensure_connection()
+        self.assertIn('постоянное соединение', out.getvalue())
+        connects = re.findall(r'соединений (\d+)', out.getvalue())
+        self.assertEqual(len(connects), 2)
+        self.assertGreater(int(connects[0]), 0)
+
+
+class SettingsProfilesTests(SimpleTestCase):
+    def load_prod(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            return importlib.reload(
+                importlib.import_module('yatube.settings.prod'))
+
+    def test_prod_profile(self):
+        prod = self.load_prod(YATUBE_SECRET_KEY='secret',
+                              YATUBE_ALLOWED_HOSTS='yatube.example')
+        self.assertFalse(prod.DEBUG)
+        self.assertEqual(prod.ALLOWED_HOSTS, ['yatube.example'])
+        options = prod.TEMPLATES[0]['OPTIONS']
+        self.assertEqual(options['loaders'][0][0],
+                         'django.template.loaders.cached.Loader')
+        self.assertNotIn('django.template.context_processors.debug',
+                         options['context_processors'])
+        self.assertIn('Manifest', prod.STATICFILES_STORAGE)
+        self.assertNotIn('locmem', prod.CACHES['default']['BACKEND'])
+        self.assertLess(prod.PROFILER_SAMPLE_RATE, 0.1)
+        # Профиль prod не меняет общие настройки из base.
+        self.assertIn('django.template.context_processors.debug',
+                      settings.TEMPLATES[0]['OPTIONS']['context_processors'])
+
+    def test_prod_profile_requires_secret_key(self):
+        with mock.patch.dict(os.environ, clear=True):
+            with self.assertRaises(ImproperlyConfigured):
+                self.load_prod()
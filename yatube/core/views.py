@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 
+from .profiler import recent_requests, slow_endpoints
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +19,18 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def profiler(request):
+    records = recent_requests()
+    slow = [record for record in records
+            if record['duration_ms'] >= settings.PROFILER_SLOW_MS]
+    context = {
+        'endpoints': slow_endpoints(records),
+        'slow_requests': slow[::-1][:20],
+        'sampled': len(records),
+        'sample_rate': settings.PROFILER_SAMPLE_RATE,
+        'slow_ms': settings.PROFILER_SLOW_MS,
+    }
+    return render(request, 'core/profiler.html', context)
@@ -0,0 +1,123 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import db
+
+VERSION_KEY: str = 'posts:version:{}'
+PAGE_KEY: str = 'posts:page:{}'
+STATS_KEY: str = 'posts:stats:{}'
+STATS: tuple = ('hits', 'misses', 'invalidations')
+
+
+def _count(name):
+    key = STATS_KEY.format(name)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_stats():
+    values = cache.get_many([STATS_KEY.format(name) for name in STATS])
+    return {name: values.get(STATS_KEY.format(name), 0) for name in STATS}
+
+
+def _initial_version():
+    # Версия из времени, чтобы после вытеснения ключа версии из кеша
+    # не ожили страницы, сохранённые под старым номером.
+    return int(time.time() * 1000)
+
+
+def _version_key(name):
+    # В именах пространств есть имена пользователей и slug групп: пробелы,
+    # кириллица или длина больше 250 символов недопустимы в ключах memcached.
+    return VERSION_KEY.format(hashlib.md5(name.encode()).hexdigest())
+
+
+def get_versions(namespaces):
+    keys = [_version_key(name) for name in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = _initial_version()
+            cache.add(key, version, None)
+            versions[key] = cache.get(key, version)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*namespaces):
+    for name in namespaces:
+        key = _version_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+        _count('invalidations')
+
+
+def invalidate_post(post):
+    namespaces = {'posts', f'post:{post.pk}',
+                  f'author:{post.author.username}'}
+    if post.group_id:
+        namespaces.add(f'group:{post.group.slug}')
+    if getattr(post, '_old_group_slug', None):
+        namespaces.add(f'group:{post._old_group_slug}')
+    invalidate(*namespaces)
+
+
+def page_key(request, namespaces, csrf_cookie=''):
+    raw = '|'.join([
+        request.get_full_path(),
+        str(request.user.pk or ''),
+        csrf_cookie,
+        *namespaces,
+        *map(str, get_versions(namespaces)),
+    ])
+    return PAGE_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def cached_page(*namespaces):
+    """Кеширует ответ до инвалидации одного из пространств имён.
+
+    Пространства имён — шаблоны вида 'group:{slug}', которые заполняются
+    аргументами view и id текущего пользователя (user_id).
+
+    Страница, собранная с реплики, не кешируется: версия уже поднята, и
+    снимок отстающей реплики остался бы в кеше до следующей правки.
+
+    Страница вошедшего пользователя может содержать CSRF-токен форм: она
+    кешируется под его CSRF-cookie, и токен в ней остаётся верным. Гостям
+    такие страницы не кешируются, чтобы не дробить общий кеш по cookie.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            names = [name.format(user_id=request.user.pk, **kwargs)
+                     for name in namespaces]
+            csrf_cookie = ''
+            if request.user.is_authenticated:
+                csrf_cookie = request.META.get('CSRF_COOKIE') or ''
+            key = page_key(request, names, csrf_cookie)
+            response = cache.get(key)
+            if response is not None:
+                _count('hits')
+                return response
+            _count('misses')
+            db.reset_replica_reads()
+            response = view(request, *args, **kwargs)
+            if (response.status_code == 200
+                    and not response.streaming
+                    and not db.replica_was_read()
+                    and (csrf_cookie
+                         or not request.META.get('CSRF_COOKIE_USED'))):
+                cache.set(key, response, settings.POSTS_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,158 @@
+import atexit
+import logging
+import threading
+import uuid
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .cache import invalidate
+from .models import AuthorStats, Comment, Post
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY: str = 'posts:pending_comments:{}:{}'
+# Страховка на случай, если процесс с очередью упадёт до записи.
+PENDING_TIMEOUT: int = 5 * 60
+MAX_ATTEMPTS: int = 5
+
+_buffer = []
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wakeup = threading.Event()
+_flusher = None
+
+
+def _pending_key(post_id, user_id):
+    return PENDING_KEY.format(post_id, user_id)
+
+
+def enqueue(comment):
+    """Ставит комментарий в очередь; в базу он попадёт со следующей пачкой.
+
+    Копия комментария кладётся в общий кеш, чтобы автор видел его сразу,
+    даже если следующий запрос обслужит другой процесс. Версия страницы
+    поста поднимается, иначе автор получил бы её из кеша или по ETag
+    без своего комментария.
+    """
+    comment.pub_date = timezone.now()
+    comment.token = uuid.uuid4().hex
+    comment.attempts = 0
+    key = _pending_key(comment.post_id, comment.author_id)
+    pending_comments = cache.get(key, [])
+    pending_comments.append((comment.token, comment.text, comment.pub_date))
+    cache.set(key, pending_comments, PENDING_TIMEOUT)
+    invalidate(f'post:{comment.post_id}')
+    with _lock:
+        _buffer.append(comment)
+        full = len(_buffer) >= settings.COMMENTS_FLUSH_SIZE
+    _start_flusher()
+    if full:
+        _wakeup.set()
+
+
+def pending(post_id, user):
+    """Ещё не записанные комментарии пользователя к посту."""
+    if not user.is_authenticated:
+        return []
+    return [
+        Comment(post_id=post_id, author=user, text=text, pub_date=pub_date)
+        for token, text, pub_date in cache.get(
+            _pending_key(post_id, user.pk), [])
+    ]
+
+
+def _forget(batch):
+    tokens = defaultdict(set)
+    for comment in batch:
+        tokens[comment.post_id, comment.author_id].add(comment.token)
+    for (post_id, author_id), written in tokens.items():
+        key = _pending_key(post_id, author_id)
+        left = [item for item in cache.get(key, [])
+                if item[0] not in written]
+        if left:
+            cache.set(key, left, PENDING_TIMEOUT)
+        else:
+            cache.delete(key)
+
+
+def _requeue(batch):
+    # Пачка возвращается в начало очереди: чаще всего запись не удалась
+    # из-за блокировки SQLite, и следующая попытка пройдёт.
+    retry = []
+    for comment in batch:
+        comment.attempts += 1
+        if comment.attempts < MAX_ATTEMPTS:
+            retry.append(comment)
+        else:
+            logger.error('Комментарий к посту %s отброшен после %s попыток',
+                         comment.post_id, comment.attempts)
+    with _lock:
+        _buffer[:0] = retry
+    _forget([comment for comment in batch
+             if comment.attempts >= MAX_ATTEMPTS])
+
+
+def flush():
+    """Записывает одну пачку через bulk_create, возвращает число взятых.
+
+    Сигналы post_save при этом не отправляются, поэтому счётчики авторов
+    и кеш страниц постов обновляются здесь, один раз на пачку. Если
+    запись не удалась, пачка возвращается в очередь.
+    """
+    with _flush_lock:
+        with _lock:
+            taken = _buffer[:settings.COMMENTS_FLUSH_SIZE]
+            del _buffer[:len(taken)]
+        if not taken:
+            return 0
+        try:
+            # Пост могли удалить, пока комментарий ждал в очереди.
+            existing = set(Post.objects.filter(
+                pk__in={comment.post_id for comment in taken}
+            ).values_list('pk', flat=True))
+            batch = [comment for comment in taken
+                     if comment.post_id in existing]
+            with transaction.atomic():
+                Comment.objects.bulk_create(batch)
+                counts = Counter(comment.author_id for comment in batch)
+                for author_id, count in counts.items():
+                    AuthorStats.bump(author_id, 'comments_count', count)
+        except Exception:
+            _requeue(taken)
+            raise
+        invalidate(*{f'post:{comment.post_id}' for comment in batch})
+        _forget(taken)
+        return len(taken)
+
+
+def flush_all():
+    while flush():
+        pass
+
+
+def _loop():
+    while True:
+        _wakeup.wait(settings.COMMENTS_FLUSH_MS / 1000)
+        _wakeup.clear()
+        close_old_connections()
+        try:
+            flush_all()
+        except Exception:
+            logger.exception('Не удалось записать пачку комментариев')
+        finally:
+            close_old_connections()
+
+
+def _start_flusher():
+    global _flusher
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_loop, name='comments',
+                                        daemon=True)
+            _flusher.start()
+            # Поток-демон не доживёт до конца очереди при остановке процесса.
+            atexit.register(flush_all)
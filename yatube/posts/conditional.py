@@ -0,0 +1,67 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import quote_etag
+
+from core import db
+
+
+def conditional(state):
+    """Отвечает 304, если валидатор не изменился, не вызывая view.
+
+    state(request, *args, **kwargs) возвращает кортеж, из которого
+    считается ETag, или None, если валидатор посчитать нельзя. Обычно это
+    версии пространств имён кеша: они поднимаются при любом изменении,
+    включая удаления и подписки, и читаются без запросов к БД.
+    Last-Modified не отправляется — по дате нельзя заметить удаление.
+    Ответ, собранный с реплики, уходит без ETag: реплика могла ещё не
+    видеть изменение, которое подняло версию.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            validators = state(request, *args, **kwargs)
+            if validators is None:
+                return view(request, *args, **kwargs)
+            etag = quote_etag(hashlib.md5(
+                repr(validators).encode()
+            ).hexdigest())
+            response = get_conditional_response(request, etag=etag)
+            fresh = True
+            if response is None:
+                db.reset_replica_reads()
+                response = view(request, *args, **kwargs)
+                fresh = not db.replica_was_read()
+            if fresh and response.status_code in (200, 304):
+                response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(state):
+    """conditional для HTML-страниц, которые зависят от пользователя.
+
+    Ответ разный для гостя и вошедшего (шапка, CSRF-токен), поэтому он
+    варьируется по Cookie, а страница вошедшего не сохраняется в общих
+    кешах. no-cache заставляет браузер и CDN каждый раз перепроверять
+    валидаторы.
+    """
+    def decorator(view):
+        view = conditional(state)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
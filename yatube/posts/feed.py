@@ -0,0 +1,167 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .models import AuthorStats, FeedEntry, Follow, Post
+from .utils import POSTS_ON_PAGE, CursorPage, CursorPaginator, paginator
+
+FEED_BATCH_SIZE: int = 1000
+
+
+def is_celebrity(author_id):
+    return AuthorStats.objects.filter(
+        author_id=author_id,
+        followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).exists()
+
+
+def _write(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=FEED_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fanout_post(post):
+    if not settings.FEED_FANOUT or is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    entries = []
+    for user_id in followers.iterator():
+        entries.append(FeedEntry(
+            user_id=user_id, post_id=post.pk, pub_date=post.pub_date
+        ))
+        if len(entries) >= FEED_BATCH_SIZE:
+            _write(entries)
+            entries = []
+    _write(entries)
+
+
+def _recent_posts(author_id):
+    return list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE])
+
+
+def backfill(user_id, author_id):
+    if not settings.FEED_FANOUT or is_celebrity(author_id):
+        return
+    _write([
+        FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in _recent_posts(author_id)
+    ])
+
+
+def refill_followers(author_id):
+    """Дописывает ленты, когда автор перестаёт быть «звездой».
+
+    Пока подписчиков было больше порога, посты автора не раскладывались
+    по лентам, а теперь лента подписчика читается только из FeedEntry.
+    """
+    if not settings.FEED_FANOUT or not AuthorStats.objects.filter(
+        author_id=author_id,
+        followers_count=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).exists():
+        return
+    posts = _recent_posts(author_id)
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    entries = []
+    for user_id in followers.iterator():
+        entries.extend(
+            FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        )
+        if len(entries) >= FEED_BATCH_SIZE:
+            _write(entries)
+            entries = []
+    _write(entries)
+
+
+def trim(user_id, author_id):
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def follow_feed(user):
+    posts = Post.objects.for_listing()
+    if not settings.FEED_FANOUT:
+        return posts.filter(author__following__user=user)
+    celebrities = Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).values('author_id')
+    fanned_out = FeedEntry.objects.filter(user=user).values('post_id')
+    return posts.filter(
+        Q(pk__in=fanned_out) | Q(author_id__in=celebrities)
+    )
+
+
+class FeedPaginator(CursorPaginator):
+    """Лента при FEED_FANOUT: страница собирается из двух источников.
+
+    Записи FeedEntry читаются по индексу (user, -pub_date), посты
+    «звёзд» — по индексу постов автора. Каждый источник отдаёт не больше
+    страницы после курсора (pub_date, id поста), результаты сливаются в
+    памяти, и только посты страницы загружаются целиком.
+    """
+
+    def __init__(self, user, per_page):
+        self.user = user
+        super().__init__(Post.objects.none(), per_page)
+
+    def sources(self):
+        celebrities = Follow.objects.filter(
+            user=self.user,
+            author__stats__followers_count__gt=(
+                settings.FEED_FANOUT_MAX_FOLLOWERS)
+        ).values('author_id')
+        return (
+            (FeedEntry.objects.filter(user=self.user), 'post_id'),
+            (Post.objects.filter(author_id__in=celebrities), 'pk'),
+        )
+
+    def keys(self, queryset, id_field, position, ascending):
+        lookup, prefix = ('gt', '') if ascending else ('lt', '-')
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(**{f'pub_date__{lookup}': pub_date})
+                | Q(pub_date=pub_date, **{f'{id_field}__{lookup}': pk})
+            )
+        return queryset.order_by(
+            f'{prefix}pub_date', f'{prefix}{id_field}'
+        ).values_list('pub_date', id_field)[:self.per_page + 1]
+
+    def cursor_page(self, cursor=None):
+        position = self.decode_cursor(cursor) if cursor else None
+        reverse = position is not None and position[2]
+        keys = set()
+        for queryset, id_field in self.sources():
+            # Старые посты «звезды» могут быть и в FeedEntry: set убирает
+            # повторы, ведь pub_date записи совпадает с pub_date поста.
+            keys.update(self.keys(queryset, id_field,
+                                  position and position[:2], reverse))
+        keys = sorted(keys, reverse=not reverse)
+        has_more = len(keys) > self.per_page
+        keys = keys[:self.per_page]
+        if reverse:
+            keys.reverse()
+        posts = Post.objects.for_listing().in_bulk([pk for _, pk in keys])
+        object_list = [posts[pk] for _, pk in keys if pk in posts]
+        if reverse:
+            return CursorPage(object_list, self, True, has_more)
+        return CursorPage(object_list, self, has_more, position is not None)
+
+
+def follow_page(request):
+    if not settings.FEED_FANOUT or request.GET.get('page') is not None:
+        return paginator(request, follow_feed(request.user))
+    feed_paginator = FeedPaginator(request.user, POSTS_ON_PAGE)
+    return {
+        'paginator': feed_paginator,
+        'page_number': None,
+        'page_obj': feed_paginator.cursor_page(request.GET.get('cursor')),
+    }
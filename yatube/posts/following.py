@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db import primary
+
+from .models import Follow
+
+FOLLOWING_KEY: str = 'posts:following:{}'
+
+
+def following_ids(request):
+    """id авторов, на которых подписан пользователь запроса.
+
+    Читаются одним запросом, кешируются на пользователя и запоминаются
+    на объекте запроса, поэтому любое число кнопок подписки на странице
+    не добавляет запросов к БД.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(request, '_following_ids', None)
+    if ids is None:
+        key = FOLLOWING_KEY.format(user.pk)
+        ids = cache.get(key)
+        if ids is None:
+            with primary():
+                ids = frozenset(Follow.objects.filter(
+                    user=user
+                ).values_list('author_id', flat=True))
+            cache.set(key, ids, settings.POSTS_CACHE_TIMEOUT)
+        request._following_ids = ids
+    return ids
+
+
+def is_following(request, author):
+    return author.pk in following_ids(request)
+
+
+def invalidate(user_id):
+    cache.delete(FOLLOWING_KEY.format(user_id))
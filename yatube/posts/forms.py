@@ -1,5 +1,9 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -16,6 +20,21 @@ class PostForm(forms.ModelForm):
                 'Введите текст сообщения.')
         return data
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        if image.size > settings.UPLOAD_MAX_BYTES:
+            raise forms.ValidationError(
+                'Картинка больше '
+                f'{filesizeformat(settings.UPLOAD_MAX_BYTES)}.')
+        width, height = image.image.size
+        if width * height > settings.UPLOAD_MAX_PIXELS:
+            raise forms.ValidationError(
+                'Слишком большое разрешение картинки.')
+        image.name = uploads.staged_name(image.name)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,91 @@
+import threading
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from core.db import primary
+
+from .cache import get_versions, invalidate as invalidate_namespaces
+from .models import Group, Post
+
+GROUPS_NAMESPACE: str = 'groups'
+STATS_KEY: str = 'posts:group_stats:{}'
+EMPTY_STATS: tuple = (0, None)
+
+_lock = threading.Lock()
+_registry = {'version': None, 'groups': {}}
+
+
+class GroupInfo(namedtuple('GroupInfo', (
+    'id', 'slug', 'title', 'description', 'post_count', 'latest_post_at',
+))):
+    def __str__(self):
+        return self.title
+
+
+def _load():
+    rows = Group.objects.order_by('title').values_list(
+        'id', 'slug', 'title', 'description')
+    return {row[1]: row for row in rows}
+
+
+def _rows():
+    version = get_versions([GROUPS_NAMESPACE])[0]
+    if _registry['version'] != version:
+        with _lock:
+            if _registry['version'] != version:
+                # Версия уже поднята: реплика могла ещё не увидеть правку.
+                with primary():
+                    _registry['groups'] = _load()
+                _registry['version'] = version
+    return _registry['groups']
+
+
+def _load_stats(group_ids):
+    stats = dict.fromkeys(group_ids, EMPTY_STATS)
+    rows = Post.objects.filter(group_id__in=group_ids).order_by().values(
+        'group_id').annotate(count=Count('pk'), latest=Max('pub_date'))
+    for row in rows:
+        stats[row['group_id']] = (row['count'], row['latest'])
+    cache.set_many({STATS_KEY.format(group_id): value
+                    for group_id, value in stats.items()}, None)
+    return stats
+
+
+def _with_stats(rows):
+    keys = {row[0]: STATS_KEY.format(row[0]) for row in rows}
+    cached = cache.get_many(keys.values())
+    stats = {group_id: cached[key] for group_id, key in keys.items()
+             if key in cached}
+    missing = [group_id for group_id in keys if group_id not in stats]
+    if missing:
+        with primary():
+            stats.update(_load_stats(missing))
+    return [GroupInfo(*row, *stats[row[0]]) for row in rows]
+
+
+def get_groups():
+    """Реестр групп процесса: slug -> GroupInfo, в порядке названий.
+
+    Описания групп загружаются одним запросом и перечитываются, только
+    когда другой процесс или сигнал поднял версию пространства имён groups
+    после правки группы. Число постов и дата последнего хранятся в общем
+    кеше отдельно для каждой группы.
+    """
+    return {info.slug: info for info in _with_stats(list(_rows().values()))}
+
+
+def get_group(slug):
+    row = _rows().get(slug)
+    return None if row is None else _with_stats([row])[0]
+
+
+def invalidate():
+    invalidate_namespaces(GROUPS_NAMESPACE)
+
+
+def invalidate_stats(*group_ids):
+    """Сбрасывает счётчики только тех групп, где пост появился или исчез."""
+    cache.delete_many([STATS_KEY.format(group_id)
+                       for group_id in group_ids if group_id])
@@ -0,0 +1,155 @@
+import json
+import math
+import platform
+import subprocess
+import time
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.urls import app_name, urlpatterns
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    rank = max(0, math.ceil(share * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число запросов к БД и пропускную '
+            'способность всех страниц posts. Изменения откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на каждый адрес')
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кеш перед каждым запросом')
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument('--compare',
+                            help='JSON прошлого замера для сравнения p95')
+
+    def scenarios(self):
+        follow = Follow.objects.select_related('user', 'author').first()
+        post = Post.objects.select_related('author').order_by('-pk').first()
+        group = Group.objects.order_by('pk').first()
+        if follow is None or post is None or group is None:
+            raise CommandError('Сначала заполните базу: manage.py seed_data')
+        reader, author = follow.user, follow.author
+        username = {'username': author.username}
+        post_id = {'post_id': post.pk}
+        return reader, post.author, {
+            'index': [('get', {}, None)],
+            'group_index': [('get', {}, None)],
+            'group_list': [('get', {'slug': group.slug}, None)],
+            'profile': [('get', username, None)],
+            'feed_rss': [('get', {}, None)],
+            'feed_atom': [('get', {}, None)],
+            'group_feed_rss': [('get', {'slug': group.slug}, None)],
+            'group_feed_atom': [('get', {'slug': group.slug}, None)],
+            'author_feed_rss': [('get', username, None)],
+            'author_feed_atom': [('get', username, None)],
+            'post_detail': [('get', post_id, None)],
+            'post_comments': [('get', post_id, None),
+                              ('get', post_id, {'format': 'json'})],
+            'add_comment': [('post', post_id, {'text': 'Замер'})],
+            'post_edit': [('get', post_id, None),
+                          ('post', post_id, {'text': post.text})],
+            'post_create': [('get', {}, None),
+                            ('post', {}, {'text': 'Замер'})],
+            'search': [('get', {}, {'q': post.text.split()[0]})],
+            'follow_index': [('get', {}, None)],
+            'profile_follow': [('post', username, None)],
+            'profile_unfollow': [('post', username, None)],
+            'follow_bulk': [('post', {}, {'follow': author.username}),
+                            ('post', {}, {'unfollow': author.username})],
+        }
+
+    def run(self, client, method, url, data, cold):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise CommandError(f'{method.upper()} {url}: '
+                               f'{response.status_code}')
+        return elapsed, len(queries)
+
+    def handle(self, *args, **options):
+        results = {}
+        with transaction.atomic():
+            reader, author, scenarios = self.scenarios()
+            missing = {pattern.name for pattern in urlpatterns} - set(
+                scenarios)
+            if missing:
+                raise CommandError(f'Нет сценария для {sorted(missing)}')
+            clients = {'reader': Client(), 'author': Client()}
+            clients['reader'].force_login(reader)
+            clients['author'].force_login(author)
+            for name, steps in scenarios.items():
+                client = clients['author' if name == 'post_edit'
+                                 else 'reader']
+                for method, kwargs, data in steps:
+                    url = reverse(f'{app_name}:{name}', kwargs=kwargs)
+                    timings, queries = [], []
+                    started = time.perf_counter()
+                    for _ in range(options['requests']):
+                        elapsed, count = self.run(client, method, url,
+                                                  data, options['cold'])
+                        timings.append(elapsed * 1000)
+                        queries.append(count)
+                    total = time.perf_counter() - started
+                    results[f'{method.upper()} {name}'] = {
+                        'url': url,
+                        'requests': len(timings),
+                        'p50_ms': round(percentile(timings, 0.5), 3),
+                        'p95_ms': round(percentile(timings, 0.95), 3),
+                        'p99_ms': round(percentile(timings, 0.99), 3),
+                        'queries': max(queries),
+                        'rps': round(len(timings) / total, 1),
+                    }
+            transaction.set_rollback(True)
+        report = {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'cold_cache': options['cold'],
+            'results': results,
+        }
+        self.print_report(results, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def print_report(self, results, compare):
+        baseline = {}
+        if compare:
+            with open(compare, encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+        for name, row in results.items():
+            line = (f'{name:<24} p50 {row["p50_ms"]:>8.2f} мс  '
+                    f'p95 {row["p95_ms"]:>8.2f} мс  '
+                    f'p99 {row["p99_ms"]:>8.2f} мс  '
+                    f'запросов {row["queries"]:>3}  {row["rps"]:>7} rps')
+            if name in baseline:
+                delta = row['p95_ms'] - baseline[name]['p95_ms']
+                line += f'  Δp95 {delta:+.2f} мс'
+            self.stdout.write(line)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import get_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания, промахи и сбросы кеша страниц'
+
+    def handle(self, *args, **options):
+        for name, value in get_stats().items():
+            self.stdout.write(f'{name}: {value}')
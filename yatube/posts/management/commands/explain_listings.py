@@ -0,0 +1,84 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+
+from posts.models import Comment, Follow, Post
+from posts.seed import seed
+from posts.utils import KEYSET_ORDERING, POSTS_ON_PAGE
+
+LISTING_MODELS: tuple = (Post, Comment, Follow)
+
+
+def listing_indexes():
+    """Составные индексы лент из Meta.indexes моделей."""
+    return [(model, index) for model in LISTING_MODELS
+            for index in model._meta.indexes]
+
+
+def _busiest(queryset, field):
+    row = queryset.values(field).annotate(
+        total=Count('pk')
+    ).order_by('-total').first()
+    return row[field] if row else None
+
+
+class Command(BaseCommand):
+    help = ('Показывает планы и время запросов лент с составными '
+            'индексами и без них')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Сколько постов создать перед замером')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def listing_queries(self):
+        page = POSTS_ON_PAGE + 1
+        posts = Post.objects.for_listing().order_by(*KEYSET_ORDERING)
+        author_id = _busiest(Post.objects.all(), 'author')
+        group_id = _busiest(Post.objects.exclude(group=None), 'group')
+        user_id = _busiest(Follow.objects.all(), 'user')
+        post_id = _busiest(Comment.objects.all(), 'post')
+        return {
+            'index': posts[:page],
+            'group_posts': posts.filter(group_id=group_id)[:page],
+            'profile': posts.filter(author_id=author_id)[:page],
+            'follow_index': posts.filter(
+                author__following__user_id=user_id
+            )[:page],
+            'comments': Comment.objects.filter(
+                post_id=post_id
+            ).order_by('pub_date')[:page],
+        }
+
+    def measure(self, title, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for name, queryset in self.listing_queries().items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {statistics.median(timings):.2f} мс'
+            ))
+            self.stdout.write(queryset.explain())
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.stdout.write(f'Создано: {seed(options["seed"])}')
+        # DDL в MySQL не откатывается транзакцией, поэтому индексы
+        # возвращаются явно, а SQL для каждой СУБД строит schema_editor.
+        indexes = listing_indexes()
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.remove_index(model, index)
+        try:
+            self.measure('Без составных индексов', options['repeat'])
+        finally:
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.add_index(model, index)
+        self.measure('С составными индексами', options['repeat'])
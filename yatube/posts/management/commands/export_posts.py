@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (BATCH_SIZE, FIELDS, FORMATS, export_records,
+                            write_records)
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки в JSONL или '
+            'CSV. Изображения выгружаются путями относительно MEDIA_ROOT.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки, «-» — stdout')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--models', nargs='+', choices=list(FIELDS),
+                            default=list(FIELDS))
+        parser.add_argument('--chunk-size', type=int, default=BATCH_SIZE,
+                            help='Строк, читаемых из БД за раз')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        records = export_records(options['models'], options['chunk_size'])
+        if path == '-':
+            write_records(records, sys.stdout, format)
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            count = write_records(records, file, format)
+        self.stdout.write(self.style.SUCCESS(f'Выгружено записей: {count}'))
@@ -0,0 +1,54 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _make_thumbnail(name):
+    try:
+        return thumbnails.make_thumbnail(name)
+    except Exception:
+        return name, None
+
+
+def _init_worker():
+    # Соединения родителя нельзя использовать в дочерних процессах.
+    for connection in connections.all():
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры картинок всех постов в пуле процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--chunk-size', type=int, default=50)
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Пропустить картинки, для которых миниатюры уже есть',
+        )
+
+    def handle(self, *args, **options):
+        names = list(Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct().iterator())
+        if options['missing']:
+            names = [name for name in names
+                     if thumbnails.cached_set(name) is None]
+        connections.close_all()
+        done = 0
+        with ProcessPoolExecutor(max_workers=options['workers'],
+                                 initializer=_init_worker) as pool:
+            results = pool.map(_make_thumbnail, names,
+                               chunksize=options['chunk_size'])
+            for name, thumbnail_set in results:
+                if thumbnail_set is None:
+                    self.stderr.write(f'Не удалось обработать {name}')
+                    continue
+                thumbnails.remember(name, thumbnail_set)
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано картинок: {done}'))
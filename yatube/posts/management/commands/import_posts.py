@@ -0,0 +1,44 @@
+import sys
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import BATCH_SIZE, FORMATS, Importer, read_records
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_posts пачками через bulk_create. '
+            'Id постов и комментариев сохраняются, если они свободны, '
+            'недостающие авторы создаются без пароля, файлы изображений '
+            'не копируются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки, «-» — stdin')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        importer = Importer(options['batch_size'])
+        try:
+            if path == '-':
+                importer.run(read_records(sys.stdin, format))
+            else:
+                with open(path, encoding='utf-8', newline='') as file:
+                    importer.run(read_records(file, format))
+        except (KeyError, ValueError) as error:
+            raise CommandError(f'Некорректная запись: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {importer.imported}, пропущено: {importer.skipped}'
+        ))
+        # bulk_create не отправляет сигналы, поэтому производные данные
+        # пересчитываются целиком.
+        for command in ('recount_stats', 'rebuild_search_index',
+                        'rebuild_feeds'):
+            call_command(command, stdout=self.stdout)
+        # Затронуты страницы любого числа групп и авторов, поэтому кеш
+        # сбрасывается целиком, а не по пространствам имён.
+        cache.clear()
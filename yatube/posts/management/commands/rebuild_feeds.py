@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает материализованные ленты подписок'
+
+    def handle(self, *args, **options):
+        if not settings.FEED_FANOUT:
+            self.stdout.write(self.style.WARNING(
+                'FEED_FANOUT выключен, ленты строятся при чтении'
+            ))
+            return
+        FeedEntry.objects.all().delete()
+        follows = Follow.objects.values_list('user_id', 'author_id')
+        for user_id, author_id in follows.iterator():
+            feed.backfill(user_id, author_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {FeedEntry.objects.count()}'
+        ))
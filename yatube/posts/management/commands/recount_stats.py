@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import AuthorStats, Comment, Follow, Post, User
+
+COUNTERS: dict = {
+    'posts_count': (Post, 'author'),
+    'comments_count': (Comment, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики авторов и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        actual = {}
+        for field, (model, key) in COUNTERS.items():
+            rows = model.objects.values_list(key).annotate(total=Count('pk'))
+            for author_id, total in rows.order_by().iterator():
+                actual.setdefault(author_id, {})[field] = total
+        existing = {
+            stats.author_id: stats
+            for stats in AuthorStats.objects.iterator()
+        }
+        to_create, to_update = [], []
+        user_ids = User.objects.values_list('pk', flat=True)
+        for author_id in user_ids.iterator():
+            counts = actual.get(author_id, {})
+            stats = existing.get(author_id)
+            if stats is None:
+                if counts:
+                    to_create.append(AuthorStats(author_id=author_id,
+                                                 **counts))
+                continue
+            drift = False
+            for field in COUNTERS:
+                value = counts.get(field, 0)
+                if getattr(stats, field) != value:
+                    setattr(stats, field, value)
+                    drift = True
+            if drift:
+                to_update.append(stats)
+        with transaction.atomic():
+            AuthorStats.objects.bulk_create(to_create, batch_size=batch_size)
+            AuthorStats.objects.bulk_update(
+                to_update, list(COUNTERS), batch_size=batch_size
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {len(to_create)}, исправлено: {len(to_update)}'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts.seed import seed
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу тестовыми пользователями, группами и постами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--groups', type=int)
+        parser.add_argument('--comments', type=int)
+        parser.add_argument('--follows', type=int,
+                            help='Подписок на одного пользователя')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора, данные воспроизводимы')
+
+    def handle(self, *args, **options):
+        created = seed(options['posts'], users=options['users'],
+                       groups=options['groups'],
+                       comments=options['comments'],
+                       follows=options['follows'],
+                       seed_value=options['seed'])
+        self.stdout.write(self.style.SUCCESS(f'Создано: {created}'))
+        # bulk_create не отправляет сигналы, поэтому производные данные
+        # пересчитываются целиком.
+        for command in ('recount_stats', 'rebuild_search_index',
+                        'rebuild_feeds'):
+            call_command(command, stdout=self.stdout)
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+COUNTERS = {
+    'posts_count': ('Post', 'author'),
+    'comments_count': ('Comment', 'author'),
+    'followers_count': ('Follow', 'author'),
+    'following_count': ('Follow', 'user'),
+}
+
+
+def fill_stats(apps, schema_editor):
+    # Без начальных значений первое событие после выкладки записало бы
+    # через bump счётчик 1 вместо настоящего итога.
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    counts = {}
+    for field, (model_name, key) in COUNTERS.items():
+        model = apps.get_model('posts', model_name)
+        rows = model.objects.order_by().values_list(key).annotate(
+            total=models.Count('pk'))
+        for author_id, total in rows.iterator():
+            counts.setdefault(author_id, {})[field] = total
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(author_id=author_id, **fields)
+         for author_id, fields in counts.items()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_auto_20221015_2140'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики автора',
+                'verbose_name_plural': 'Счётчики авторов',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from core.models import CreatedModel
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -14,6 +15,15 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('author', 'group').only(
+            'id', 'text', 'pub_date', 'updated', 'image',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__slug', 'group__title',
+        )
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name='Текст поста *',
@@ -38,14 +48,34 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text
 
 
+class CommentQuerySet(models.QuerySet):
+    def for_listing(self):
+        return self.select_related('author').only(
+            'id', 'text', 'pub_date', 'post_id',
+            'author__username', 'author__first_name', 'author__last_name',
+        )
+
+
 class Comment(CreatedModel):
     post = models.ForeignKey(
         Post,
@@ -62,6 +92,22 @@ class Comment(CreatedModel):
     text = models.TextField(
         verbose_name='Текст комментария:',
     )
+    # В отличие от auto_now_add, default не перезаписывает дату, которую
+    # отложенная запись проставила при постановке комментария в очередь.
+    pub_date = models.DateTimeField(
+        'Дата создания',
+        default=timezone.now,
+        editable=False,
+        db_index=True
+    )
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'pub_date'],
+                         name='comment_post_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -82,3 +128,73 @@ class Follow(models.Model):
             fields=['author', 'user'],
             name='unique_follow')
         ]
+        indexes = [
+            models.Index(fields=['user', 'author'],
+                         name='follow_user_author_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики автора'
+        verbose_name_plural = 'Счётчики авторов'
+
+    def __str__(self):
+        return f'Счётчики {self.author_id}'
+
+    @classmethod
+    def bump(cls, author_id, field, delta):
+        stats = cls.objects.filter(author_id=author_id)
+        if delta < 0:
+            stats = stats.filter(**{f'{field}__gte': -delta})
+        increment = {field: models.F(field) + delta}
+        with transaction.atomic():
+            if stats.update(**increment) or delta < 0:
+                return
+            _, created = cls.objects.get_or_create(
+                author_id=author_id, defaults={field: delta}
+            )
+            if not created:
+                stats.update(**increment)
+
+
+def get_author_stats(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(author=user)
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'post'],
+            name='unique_feed_entry')
+        ]
+        indexes = [models.Index(
+            fields=['user', '-pub_date'],
+            name='feed_user_pub_date_idx')
+        ]
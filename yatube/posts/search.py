@@ -0,0 +1,217 @@
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .utils import POSTS_ON_PAGE, CursorPage
+
+SEARCH_CURSOR_SALT: str = 'posts.search.cursor'
+# Бэкенд по умолчанию для СУБД: таблицу FTS5 миграция создаёт только в
+# SQLite, для остальных работает LikeBackend.
+VENDOR_BACKENDS: dict = {
+    'sqlite': 'posts.search.Fts5Backend',
+}
+DEFAULT_BACKEND: str = 'posts.search.LikeBackend'
+FTS_TABLE: str = 'posts_post_fts'
+# Служебные символы вместо тегов, чтобы экранировать текст поста целиком
+# и только потом расставить <mark>.
+MARK_START: str = '\x02'
+MARK_END: str = '\x03'
+
+SearchHit = namedtuple('SearchHit', ('post_id', 'rank', 'snippet'))
+
+
+def highlight(snippet):
+    return mark_safe(escape(snippet).replace(
+        MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+class SearchBackend(ABC):
+    @abstractmethod
+    def index(self, post):
+        """Добавляет пост в индекс или обновляет его текст."""
+
+    @abstractmethod
+    def remove(self, post_id):
+        """Убирает пост из индекса."""
+
+    @abstractmethod
+    def rebuild(self):
+        """Перестраивает индекс по всем постам."""
+
+    @abstractmethod
+    def filter(self, queryset, query):
+        """Оставляет в queryset постов только подходящие под запрос."""
+
+    @abstractmethod
+    def search(self, query, position=None, reverse=False,
+               limit=POSTS_ON_PAGE):
+        """Возвращает SearchHit, упорядоченные по (rank, post_id).
+
+        position — (rank, post_id), после которого (или до которого,
+        если reverse) нужно продолжить выдачу.
+        """
+
+
+class Fts5Backend(SearchBackend):
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE}(rowid, text) '
+                'VALUES (%s, %s)', [post.pk, post.text]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) '
+                'SELECT id, text FROM posts_post'
+            )
+
+    @staticmethod
+    def match_expression(query):
+        terms = query.split()
+        return ' '.join('"{}"'.format(term.replace('"', '""'))
+                        for term in terms)
+
+    def filter(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match],
+        ))
+
+    def search(self, query, position=None, reverse=False,
+               limit=POSTS_ON_PAGE):
+        match = self.match_expression(query)
+        if not match:
+            return []
+        sql = [
+            f'SELECT rowid, bm25({FTS_TABLE}) AS score, '
+            f"snippet({FTS_TABLE}, 0, %s, %s, '…', 32) "
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        ]
+        params = [MARK_START, MARK_END, match]
+        sign, order = ('<', 'DESC') if reverse else ('>', 'ASC')
+        if position is not None:
+            rank, post_id = position
+            sql.append(
+                f'AND (bm25({FTS_TABLE}) {sign} %s OR '
+                f'(bm25({FTS_TABLE}) = %s AND rowid {sign} %s))'
+            )
+            params += [rank, rank, post_id]
+        sql.append(f'ORDER BY score {order}, rowid {order} LIMIT %s')
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(' '.join(sql), params)
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+class LikeBackend(SearchBackend):
+    """Запасной вариант для СУБД без полнотекстового индекса."""
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def filter(self, queryset, query):
+        for term in query.split():
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+
+    def search(self, query, position=None, reverse=False,
+               limit=POSTS_ON_PAGE):
+        if not query.split():
+            return []
+        posts = self.filter(Post.objects.all(), query).order_by('id')
+        if position is not None:
+            lookup = 'id__lt' if reverse else 'id__gt'
+            posts = posts.filter(**{lookup: position[1]})
+        if reverse:
+            posts = posts.reverse()
+        hits = []
+        for post_id, text in posts.values_list('id', 'text')[:limit]:
+            snippet = text
+            for term in query.split():
+                start = snippet.lower().find(term.lower())
+                if start != -1:
+                    end = start + len(term)
+                    snippet = (snippet[:start] + MARK_START
+                               + snippet[start:end] + MARK_END
+                               + snippet[end:])
+            hits.append(SearchHit(post_id, 0, snippet))
+        return hits
+
+
+def get_backend():
+    """POSTS_SEARCH_BACKEND или бэкенд, подходящий к СУБД соединения."""
+    path = settings.POSTS_SEARCH_BACKEND or VENDOR_BACKENDS.get(
+        connection.vendor, DEFAULT_BACKEND)
+    return import_string(path)()
+
+
+class SearchPaginator:
+    def __init__(self, query, per_page=POSTS_ON_PAGE, backend=None):
+        self.query = query
+        self.per_page = per_page
+        self.backend = backend or get_backend()
+
+    def encode_cursor(self, post, reverse=False):
+        return signing.dumps([post.search_rank, post.pk, int(reverse)],
+                             salt=SEARCH_CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        try:
+            rank, post_id, reverse = signing.loads(
+                cursor, salt=SEARCH_CURSOR_SALT
+            )
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+        return (rank, post_id), bool(reverse)
+
+    def cursor_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        position, reverse = decoded or (None, False)
+        hits = self.backend.search(self.query, position, reverse,
+                                   self.per_page + 1)
+        has_more = len(hits) > self.per_page
+        hits = hits[:self.per_page]
+        if reverse:
+            hits.reverse()
+        posts = Post.objects.for_listing().in_bulk(
+            [hit.post_id for hit in hits]
+        )
+        results = []
+        for hit in hits:
+            post = posts.get(hit.post_id)
+            if post is None:
+                continue
+            post.search_rank = hit.rank
+            post.snippet = highlight(hit.snippet)
+            results.append(post)
+        if not results:
+            return CursorPage([], self, False, False)
+        if reverse:
+            return CursorPage(results, self, True, has_more)
+        return CursorPage(results, self, has_more, position is not None)
@@ -0,0 +1,92 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE: int = 5000
+TEXT_POOL_SIZE: int = 1000
+
+
+@contextmanager
+def explicit_pub_dates(*models):
+    # bulk_create перезаписывает auto_now_add текущим временем, а для
+    # замеров посты должны быть разнесены по времени.
+    fields = {model._meta.get_field('pub_date'): None for model in models}
+    for field in fields:
+        fields[field], field.auto_now_add = field.auto_now_add, False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in fields.items():
+            field.auto_now_add = auto_now_add
+
+
+def _bulk(model, objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def seed(posts, users=None, groups=None, comments=None, follows=None,
+         seed_value=0):
+    users = users or max(1, posts // 1000)
+    groups = groups or max(1, posts // 10000)
+    comments = posts // 10 if comments is None else comments
+    follows = min(50, users - 1) if follows is None else follows
+    rnd = random.Random(seed_value)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed_value)
+    # Faker медленный, поэтому тексты берутся из заранее созданного набора.
+    texts = [fake.paragraph(nb_sentences=4) for _ in range(TEXT_POOL_SIZE)]
+    now = timezone.now()
+    prefix = f'seed{seed_value}'
+    with transaction.atomic(), explicit_pub_dates(Post, Comment):
+        _bulk(User, (User(username=f'{prefix}-user-{i}',
+                          first_name=fake.first_name(),
+                          last_name=fake.last_name())
+                     for i in range(users)))
+        _bulk(Group, (Group(title=fake.catch_phrase(),
+                            slug=f'{prefix}-group-{i}',
+                            description=fake.sentence())
+                      for i in range(groups)))
+        user_ids = list(User.objects.filter(
+            username__startswith=f'{prefix}-user-'
+        ).values_list('id', flat=True))
+        group_ids = list(Group.objects.filter(
+            slug__startswith=f'{prefix}-group-'
+        ).values_list('id', flat=True))
+        _bulk(Post, (
+            Post(author_id=rnd.choice(user_ids),
+                 group_id=rnd.choice(group_ids + [None]),
+                 text=rnd.choice(texts),
+                 pub_date=now - timedelta(seconds=posts - i))
+            for i in range(posts)
+        ))
+        post_ids = list(Post.objects.filter(
+            author_id__in=user_ids
+        ).values_list('id', flat=True).iterator())
+        _bulk(Comment, (
+            Comment(post_id=rnd.choice(post_ids),
+                    author_id=rnd.choice(user_ids),
+                    text=rnd.choice(texts),
+                    pub_date=now - timedelta(seconds=comments - i))
+            for i in range(comments if post_ids else 0)
+        ))
+        _bulk(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in rnd.sample(user_ids,
+                                        min(follows + 1, len(user_ids)))
+            if author_id != user_id
+        ))
+    return {'users': users, 'groups': groups, 'posts': posts,
+            'comments': comments}
@@ -0,0 +1,103 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import feed, following, groups, thumbnails, uploads
+from .cache import invalidate, invalidate_post
+from .search import get_backend as get_search_backend
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+
+def invalidate_follow_pages(follow):
+    following.invalidate(follow.user_id)
+    invalidate(f'follow:{follow.user_id}',
+               f'author:{follow.author.username}',
+               f'author:{follow.user.username}')
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    if not instance.pk:
+        return
+    old = Post.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'group__slug', 'image').first() or (None, None, None)
+    (instance._old_group_id, instance._old_group_slug,
+     instance._old_image_name) = old
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.bump(instance.author_id, 'posts_count', 1)
+        feed.fanout_post(instance)
+    get_search_backend().index(instance)
+    # Картинку обрабатываем, только если её заменили: правка текста не
+    # должна заново открывать файл.
+    image_name = instance.image.name if instance.image else None
+    if image_name and image_name != getattr(instance, '_old_image_name',
+                                            None):
+        if uploads.is_staged(image_name):
+            uploads.schedule(instance)
+        else:
+            thumbnails.schedule_for(instance)
+    # Число постов и дата последнего меняются, только когда пост попадает
+    # в группу или уходит из неё; реестр описаний групп не трогаем.
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if old_group_id != instance.group_id:
+        groups.invalidate_stats(old_group_id, instance.group_id)
+    invalidate_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    AuthorStats.bump(instance.author_id, 'posts_count', -1)
+    get_search_backend().remove(instance.pk)
+    groups.invalidate_stats(instance.group_id)
+    invalidate_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.bump(instance.author_id, 'comments_count', 1)
+    invalidate(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    AuthorStats.bump(instance.author_id, 'comments_count', -1)
+    invalidate(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.bump(instance.author_id, 'followers_count', 1)
+        AuthorStats.bump(instance.user_id, 'following_count', 1)
+        feed.backfill(instance.user_id, instance.author_id)
+    invalidate_follow_pages(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    AuthorStats.bump(instance.author_id, 'followers_count', -1)
+    AuthorStats.bump(instance.user_id, 'following_count', -1)
+    feed.trim(instance.user_id, instance.author_id)
+    feed.refill_followers(instance.author_id)
+    invalidate_follow_pages(instance)
+
+
+@receiver(pre_save, sender=Group)
+def group_changing(sender, instance, **kwargs):
+    if instance.pk:
+        instance._old_slug = Group.objects.filter(
+            pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # После смены slug страница по старому адресу должна отдать 404.
+    namespaces = {'posts', f'group:{instance.slug}', groups.GROUPS_NAMESPACE}
+    if getattr(instance, '_old_slug', None):
+        namespaces.add(f'group:{instance._old_slug}')
+    invalidate(*namespaces)
@@ -0,0 +1,101 @@
+from django.contrib.syndication.views import Feed
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .groups import get_group
+from .models import Post, User
+from .utils import KEYSET_ORDERING
+
+FEED_SIZE: int = 20
+TITLE_LENGTH: int = 60
+
+
+class PostsFeed(Feed):
+    def title(self, obj):
+        return 'Yatube: последние записи'
+
+    def description(self, obj):
+        return 'Новые записи всех авторов Yatube'
+
+    def subtitle(self, obj):
+        # В Atom описание ленты называется subtitle, RSS его не использует.
+        return self.description(obj)
+
+    def link(self, obj):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.for_listing()
+
+    def items(self, obj):
+        return self.posts(obj).order_by(*KEYSET_ORDERING)[:FEED_SIZE]
+
+    def item_title(self, post):
+        return Truncator(post.text).chars(TITLE_LENGTH)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', kwargs={'post_id': post.pk})
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_updateddate(self, post):
+        return post.updated
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+
+class GroupPostsFeed(PostsFeed):
+    def get_object(self, request, slug):
+        group = get_group(slug)
+        if group is None:
+            raise Http404
+        return group
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', kwargs={'slug': group.slug})
+
+    def posts(self, group):
+        return Post.objects.for_listing().filter(group_id=group.id)
+
+
+class AuthorPostsFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи автора {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', kwargs={'username': author.username})
+
+    def posts(self, author):
+        return Post.objects.for_listing().filter(author=author)
+
+
+class PostsAtomFeed(PostsFeed):
+    feed_type = Atom1Feed
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
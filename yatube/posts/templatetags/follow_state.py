@@ -0,0 +1,13 @@
+from django import template
+
+from .. import following
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, author):
+    request = context.get('request')
+    if request is None:
+        return False
+    return following.is_following(request, author)
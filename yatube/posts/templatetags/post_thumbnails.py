@@ -0,0 +1,48 @@
+from django import template
+
+from .. import thumbnails, uploads
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail_set(post):
+    if not post.image or uploads.is_staged(post.image.name):
+        # Пока загрузка обрабатывается, в шаблоне показывается заглушка.
+        return None
+    cached = thumbnails.cached_set(post.image.name)
+    if cached:
+        return cached
+    if thumbnails.failed(post.image.name):
+        return None
+    thumbnails.schedule_for(post)
+    # В синхронном режиме вне транзакции миниатюры уже готовы.
+    return thumbnails.cached_set(post.image.name)
+
+
+def _srcset(variants):
+    return ', '.join(f'{url} {width}w' for width, url in variants)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def responsive_image(thumbs, profile='card', css_class='card-img my-2'):
+    """<picture> с srcset по всем ширинам профиля; без миниатюр — заглушка.
+
+    URL берутся из кеша миниатюр, поэтому хранилище не опрашивается.
+    """
+    context = {'css_class': css_class, 'sources': [], 'src': None}
+    variants = (thumbs or {}).get(profile)
+    if not variants:
+        return context
+    fallback = variants[thumbnails.FORMATS[-1]]
+    src = [url for width, url in fallback
+           if width <= thumbnails.FALLBACK_WIDTH]
+    context.update(
+        sources=[(f'image/{image_format.lower()}',
+                  _srcset(variants[image_format]))
+                 for image_format in thumbnails.FORMATS[:-1]],
+        src=src[-1] if src else fallback[0][1],
+        srcset=_srcset(fallback),
+        sizes=thumbnails.PROFILES[profile].sizes,
+    )
+    return context
@@ -1,19 +1,23 @@
+import os
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from .. import uploads
 from ..models import Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 CREATE_PAGE = reverse('posts:post_create')
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
 class PostsFormsTests(TestCase):
     @classmethod
     def tearDownClass(cls):
@@ -93,3 +97,63 @@ class PostsFormsTests(TestCase):
                         pub_date=self.post.pub_date
                         ).exists())
         self.assertNotEqual(original_text.text, form_data['text'])
+
+
+def make_image(size, exif=None):
+    buffer = BytesIO()
+    image = Image.new('RGB', size, 'red')
+    if exif is None:
+        image.save(buffer, 'JPEG')
+    else:
+        image.save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False,
+                   UPLOAD_ASYNC=False, UPLOAD_MAX_SIDE=100)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='uploader')
+        self.client.force_login(self.user)
+
+    def upload(self, content, text='С картинкой'):
+        image = SimpleUploadedFile('photo.jpg', content,
+                                   content_type='image/jpeg')
+        return self.client.post(CREATE_PAGE,
+                                {'text': text, 'image': image})
+
+    def test_image_is_resized_and_stripped_of_metadata(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Камера'
+        self.upload(make_image((400, 200), exif.tobytes()))
+        post = Post.objects.get(text='С картинкой')
+        self.assertFalse([
+            name for name in os.listdir(os.path.join(TEMP_MEDIA_ROOT,
+                                                     'posts'))
+            if uploads.is_staged(name)
+        ])
+        self.assertTrue(post.image.name.endswith('.webp'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertNotIn('exif', image.info)
+
+    def test_identical_uploads_share_one_file(self):
+        content = make_image((50, 50))
+        self.upload(content, text='Первый')
+        self.upload(content, text='Второй')
+        first = Post.objects.get(text='Первый')
+        second = Post.objects.get(text='Второй')
+        self.assertEqual(first.image.name, second.image.name)
+
+    @override_settings(UPLOAD_MAX_PIXELS=100)
+    def test_too_large_image_is_rejected(self):
+        response = self.upload(make_image((20, 20)))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFormError(response, 'form', 'image',
+                             'Слишком большое разрешение картинки.')
+        self.assertFalse(Post.objects.exists())
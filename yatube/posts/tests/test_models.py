@@ -1,7 +1,13 @@
+import tempfile
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 
-from ..models import Group, Post
+from ..models import AuthorStats, Comment, Follow, Group, Post
+from ..transfer import Importer, read_records
 
 FIRST_CHARACTERS_POST: int = 15
 User = get_user_model()
@@ -31,3 +37,142 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+class AuthorStatsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.reader = User.objects.create_user(username='reader')
+
+    def get_stats(self, user):
+        return AuthorStats.objects.get(author=user)
+
+    def test_counters_follow_create_and_delete(self):
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        Comment.objects.create(author=self.reader, post=post, text='Ок')
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(self.get_stats(self.user).posts_count, 1)
+        self.assertEqual(self.get_stats(self.user).followers_count, 1)
+        self.assertEqual(self.get_stats(self.reader).comments_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+        follow.delete()
+        post.delete()
+        self.assertEqual(self.get_stats(self.user).posts_count, 0)
+        self.assertEqual(self.get_stats(self.user).followers_count, 0)
+        self.assertEqual(self.get_stats(self.reader).comments_count, 0)
+        self.assertEqual(self.get_stats(self.reader).following_count, 0)
+
+    def test_recount_stats_repairs_drift(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}') for i in range(3)
+        )
+        AuthorStats.objects.filter(author=self.reader).delete()
+        AuthorStats.objects.create(author=self.reader, posts_count=5)
+        call_command('recount_stats', stdout=StringIO())
+        self.assertEqual(self.get_stats(self.user).posts_count, 3)
+        self.assertEqual(self.get_stats(self.reader).posts_count, 0)
+
+
+class ListingIndexesTest(TransactionTestCase):
+    # schema_editor в SQLite нельзя открыть внутри транзакции TestCase.
+    def test_explain_listings_uses_composite_indexes(self):
+        out = StringIO()
+        call_command('explain_listings', seed=100, repeat=1, stdout=out)
+        plans = out.getvalue().split('С составными индексами')[1]
+        self.assertIn('post_author_pub_date_idx', plans)
+        self.assertIn('post_group_pub_date_idx', plans)
+        self.assertIn('comment_post_pub_date_idx', plans)
+        self.assertEqual(Post.objects.count(), 100)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table)
+        self.assertIn('post_author_pub_date_idx', constraints)
+
+
+class TransferCommandsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(author=self.user, group=self.group,
+                                        text='Тестовый пост',
+                                        image='posts/small.gif')
+        Post.objects.create(author=self.reader, text='Пост без группы')
+        Comment.objects.create(author=self.reader, post=self.post, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.user)
+
+    def export(self, format):
+        output = tempfile.NamedTemporaryFile(suffix=f'.{format}')
+        self.addCleanup(output.close)
+        call_command('export_posts', output.name, chunk_size=1,
+                     stdout=StringIO())
+        return output.name
+
+    def test_export_import_round_trip(self):
+        for format in ('jsonl', 'csv'):
+            with self.subTest(format=format):
+                path = self.export(format)
+                Post.objects.all().delete()
+                Group.objects.all().delete()
+                User.objects.filter(username='reader').delete()
+                call_command('import_posts', path, batch_size=1,
+                             stdout=StringIO())
+                post = Post.objects.get(pk=self.post.pk)
+                self.assertEqual(post.group.slug, self.group.slug)
+                self.assertEqual(post.image.name, 'posts/small.gif')
+                self.assertEqual(post.pub_date, self.post.pub_date)
+                self.assertEqual(Post.objects.count(), 2)
+                self.assertIsNone(
+                    Post.objects.get(author__username='reader').group)
+                self.assertEqual(post.comments.get().author.username,
+                                 'reader')
+                self.assertTrue(Follow.objects.filter(
+                    user__username='reader', author=self.user).exists())
+                self.assertEqual(
+                    AuthorStats.objects.get(author=self.user).posts_count, 1)
+
+    def test_import_is_idempotent(self):
+        path = self.export('jsonl')
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        new_post = Post.objects.create(author=self.user, text='Новый')
+        self.assertGreater(new_post.pk, self.post.pk)
+
+    def test_import_remaps_taken_ids(self):
+        path = self.export('jsonl')
+        Comment.objects.all().delete()
+        Post.objects.all().delete()
+        # id постов из выгрузки заняты другими, несвязанными постами.
+        other = User.objects.create_user(username='other')
+        for post_id in (self.post.pk, self.post.pk + 1):
+            Post.objects.create(id=post_id, author=other, text='Чужой')
+        out = StringIO()
+        call_command('import_posts', path, stdout=out)
+        self.assertIn("'post': 2", out.getvalue())
+        self.assertEqual(Post.objects.filter(author=other).count(), 2)
+        self.assertFalse(Comment.objects.filter(post__author=other).exists())
+        post = Post.objects.get(text='Тестовый пост')
+        self.assertNotEqual(post.pk, self.post.pk)
+        self.assertEqual(post.comments.get().text, 'Ок')
+        out = StringIO()
+        call_command('import_posts', path, stdout=out)
+        self.assertIn("Загружено: {'group': 0, 'post': 0, 'comment': 0, "
+                      "'follow': 0}", out.getvalue())
+
+    def test_importer_remembers_only_changed_post_ids(self):
+        path = self.export('jsonl')
+        Post.objects.filter(pk=self.post.pk).delete()
+        Post.objects.create(id=self.post.pk, author=self.reader,
+                            text='Чужой')
+        importer = Importer()
+        with open(path, encoding='utf-8') as file:
+            importer.run(read_records(file, 'jsonl'))
+        post = Post.objects.get(text='Тестовый пост')
+        self.assertEqual(importer.post_ids, {self.post.pk: post.pk})
+        self.assertEqual(post.comments.get().text, 'Ок')
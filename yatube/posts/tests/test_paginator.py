@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -10,6 +11,7 @@ COUNT_TEST_POSTS: int = POSTS_ON_PAGE + 1
 
 class PostsPaginatorTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='test-username')
         self.authorized_client = Client()
@@ -41,3 +43,23 @@ class PostsPaginatorTests(TestCase):
                              POSTS_ON_PAGE)
             self.assertEqual(len(response_2.context['page_obj']),
                              COUNT_TEST_POSTS - POSTS_ON_PAGE)
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        response_1 = self.guest_client.get(INDEX_PAGE)
+        page_1 = response_1.context['page_obj']
+        self.assertTrue(page_1.has_next())
+        self.assertFalse(page_1.has_previous())
+        response_2 = self.guest_client.get(
+            INDEX_PAGE, {'cursor': page_1.next_cursor})
+        page_2 = response_2.context['page_obj']
+        self.assertEqual(len(page_2), COUNT_TEST_POSTS - POSTS_ON_PAGE)
+        self.assertFalse(page_2.has_next())
+        self.assertNotIn(page_2[0], list(page_1))
+        response_3 = self.guest_client.get(
+            INDEX_PAGE, {'cursor': page_2.previous_cursor})
+        self.assertEqual(list(response_3.context['page_obj']), list(page_1))
+
+    def test_invalid_cursor_shows_first_page(self):
+        response = self.guest_client.get(INDEX_PAGE, {'cursor': 'broken'})
+        self.assertEqual(len(response.context['page_obj']), POSTS_ON_PAGE)
+        self.assertFalse(response.context['page_obj'].has_previous())
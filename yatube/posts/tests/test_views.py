@@ -1,14 +1,32 @@
+import json
+import re
 import shutil
 import tempfile
+import warnings
+from io import BytesIO, StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.template.loader import render_to_string
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from PIL import Image
 
-from ..models import Comment, Follow, Group, Post, User
+from .. import comment_buffer, thumbnails
+from ..cache import get_stats, get_versions
+from ..groups import GROUPS_NAMESPACE, get_group, get_groups
+from ..models import Comment, FeedEntry, Follow, Group, Post, User
+from ..search import Fts5Backend, LikeBackend
+from ..search import get_backend as get_search_backend
+from ..urls import urlpatterns
+from ..utils import COMMENTS_ON_PAGE, POSTS_ON_PAGE
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 CREATE_PAGE = reverse('posts:post_create')
@@ -16,7 +34,7 @@ INDEX_PAGE = reverse('posts:index')
 FOLLOW_PAGE = reverse('posts:follow_index')
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
 class PostsViewsTests(TestCase):
     @classmethod
     def tearDownClass(cls):
@@ -25,6 +43,11 @@ class PostsViewsTests(TestCase):
 
     def setUp(self):
         cache.clear()
+        # TestCase не фиксирует транзакцию: миниатюры создаются сразу.
+        on_commit = mock.patch('posts.thumbnails.transaction.on_commit',
+                               lambda callback: callback())
+        on_commit.start()
+        self.addCleanup(on_commit.stop)
         self.guest_client = Client()
         self.user = User.objects.create_user(username='test-username')
         self.authorized_client = Client()
@@ -93,6 +116,34 @@ class PostsViewsTests(TestCase):
         for context, expected in object_element.items():
             self.assertEqual(context, expected)
 
+    def test_index_shows_generated_thumbnail(self):
+        response = self.authorized_client.get(INDEX_PAGE)
+        variants = thumbnails.cached_set(self.post.image.name)['card']
+        # Исходник уже 320 пикселей, поэтому крупные ширины не создаются.
+        self.assertEqual([width for width, url in variants['WEBP']], [320])
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, f'{variants["WEBP"][0][1]} 320w')
+        self.assertContains(response, f'src="{variants["JPEG"][0][1]}"')
+        self.assertNotContains(response, 'placeholder.svg')
+
+    def test_thumbnail_set_covers_profile_widths(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(buffer, 'PNG')
+        post = Post.objects.create(
+            author=self.user, text='wide',
+            image=SimpleUploadedFile('wide.png', buffer.getvalue()),
+        )
+        variants = thumbnails.cached_set(post.image.name)['card']
+        self.assertEqual([width for width, url in variants['JPEG']],
+                         [320, 640, 960])
+        self.assertTrue(variants['WEBP'][0][1].endswith('.webp'))
+        # Разметка строится из кеша: миниатюры не пересоздаются.
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail:
+            response = self.client.get(self.PROFILE_PAGE)
+        get_thumbnail.assert_not_called()
+        self.assertContains(response, f'{variants["JPEG"][2][1]} 960w')
+        self.assertContains(response, 'sizes="(min-width: 992px)')
+
     def test_group_list_pages_show_correct_context(self):
         response = self.authorized_client.get(self.GROUP_PAGE)
         for post in response.context['page_obj']:
@@ -153,14 +204,43 @@ class PostsViewsTests(TestCase):
         self.assertEqual(response.context['post'].comments, self.post.comments)
 
     def test_cache(self):
-        post = Post.objects.filter(id=self.post.id)
         response = self.authorized_client.get(INDEX_PAGE)
-        post.delete()
         response_2 = self.authorized_client.get(INDEX_PAGE)
         self.assertEqual(response.content, response_2.content)
-        cache.clear()
+        self.assertEqual(get_stats()['hits'], 1)
+        Post.objects.filter(id=self.post.id).delete()
         response_3 = self.authorized_client.get(INDEX_PAGE)
         self.assertNotEqual(response.content, response_3.content)
+        self.assertNotIn(self.post, response_3.context['page_obj'])
+
+    def test_cache_invalidated_per_group(self):
+        self.authorized_client.get(self.GROUP_PAGE)
+        Group.objects.create(title='test-group_2', slug='test-slug_2')
+        self.authorized_client.get(self.GROUP_PAGE)
+        self.assertEqual(get_stats()['hits'], 1)
+        Comment.objects.create(author=self.user, post=self.post, text='new')
+        self.authorized_client.get(self.GROUP_PAGE)
+        self.assertEqual(get_stats()['hits'], 2)
+        Post.objects.create(author=self.user, group=self.group, text='new')
+        self.authorized_client.get(self.GROUP_PAGE)
+        self.assertEqual(get_stats()['misses'], 2)
+
+    def test_group_slug_change_drops_old_page(self):
+        self.authorized_client.get(self.GROUP_PAGE)
+        self.group.slug = 'test-slug-renamed'
+        self.group.save()
+        response = self.authorized_client.get(self.GROUP_PAGE)
+        self.assertEqual(response.status_code, 404)
+
+    def test_cache_keys_are_safe_for_any_names(self):
+        # create_user и импорт не проверяют имя валидаторами формы.
+        author = User.objects.create_user(username='Автор с пробелом')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            Post.objects.create(author=author, text='test-post')
+            response = self.client.get(reverse(
+                'posts:profile', kwargs={'username': author.username}))
+        self.assertEqual(response.status_code, 200)
 
     def test_authorized_client_can_follow_unfollow(self):
         self.user_following = User.objects.create_user(username='following')
@@ -168,17 +248,716 @@ class PostsViewsTests(TestCase):
             author=self.user_following,
             text='Тестовая запись для тестирования подписки.'
         )
-        self.authorized_client.get(reverse(
+        self.authorized_client.post(reverse(
             'posts:profile_follow', kwargs={
                 'username': self.user_following.username}))
         self.assertEqual(Follow.objects.all().count(), 1)
         response = self.authorized_client.get(FOLLOW_PAGE)
         test_post = response.context['page_obj']
         self.assertIn(self.post, test_post)
-        self.authorized_client.get(reverse(
+        self.authorized_client.post(reverse(
             'posts:profile_unfollow', kwargs={
                 'username': self.user_following.username}))
         self.assertEqual(Follow.objects.all().count(), 0)
         response_2 = self.authorized_client.get(FOLLOW_PAGE)
         test_post_2 = response_2.context['page_obj']
         self.assertNotIn(self.post, test_post_2)
+
+
+class FollowEndpointsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.authors = [User.objects.create_user(username=f'author-{i}')
+                        for i in range(3)]
+        self.FOLLOW_URL = reverse('posts:profile_follow',
+                                  kwargs={'username': 'author-0'})
+        self.UNFOLLOW_URL = reverse('posts:profile_unfollow',
+                                    kwargs={'username': 'author-0'})
+
+    def test_follow_requires_post(self):
+        for url in (self.FOLLOW_URL, self.UNFOLLOW_URL,
+                    reverse('posts:follow_bulk')):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 405)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_and_unfollow_are_idempotent(self):
+        for _ in range(2):
+            response = self.authorized_client.post(self.FOLLOW_URL)
+            self.assertRedirects(response, reverse(
+                'posts:profile', kwargs={'username': 'author-0'}))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.authors[0].stats.followers_count, 1)
+        for _ in range(2):
+            response = self.authorized_client.post(
+                self.UNFOLLOW_URL, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.json(),
+                             {'author': 'author-0', 'following': False})
+        self.assertFalse(Follow.objects.exists())
+
+    def test_cannot_follow_self_or_missing_author(self):
+        response = self.authorized_client.post(
+            reverse('posts:profile_follow',
+                    kwargs={'username': 'test-username'}),
+            HTTP_ACCEPT='application/json')
+        self.assertFalse(response.json()['following'])
+        response = self.authorized_client.post(
+            reverse('posts:profile_follow', kwargs={'username': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_bulk_follow_and_unfollow(self):
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        response = self.authorized_client.post(
+            reverse('posts:follow_bulk'),
+            json.dumps({'follow': ['author-0', 'author-1', 'author-2',
+                                   'test-username'],
+                        'unfollow': []}),
+            content_type='application/json',
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.json()['following'],
+                         ['author-0', 'author-1', 'author-2'])
+        self.assertEqual(Follow.objects.count(), 3)
+        self.assertEqual(self.user.stats.following_count, 3)
+        response = self.authorized_client.post(
+            reverse('posts:follow_bulk'),
+            {'unfollow': ['author-0', 'author-1']},
+        )
+        self.assertRedirects(response, FOLLOW_PAGE)
+        self.assertEqual(
+            list(Follow.objects.values_list('author__username', flat=True)),
+            ['author-2'])
+        response = self.authorized_client.post(
+            reverse('posts:follow_bulk'),
+            json.dumps({'unfollow': ['author-1', 'author-2']}),
+            content_type='application/json',
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.json()['unfollowed'], ['author-2'])
+
+    def test_bulk_rejects_malformed_json(self):
+        for body in ([], 5, {'follow': 'author-0'}, {'unfollow': [1]},
+                     {'follow': [f'a{i}' for i in range(101)]}):
+            with self.subTest(body=body):
+                response = self.authorized_client.post(
+                    reverse('posts:follow_bulk'), json.dumps(body),
+                    content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_profile_with_follow_form_is_cached(self):
+        profile = reverse('posts:profile', kwargs={'username': 'author-0'})
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        # Первый ответ выдаёт CSRF-cookie, дальше страница кешируется под ней.
+        for _ in range(3):
+            response = client.get(profile)
+        self.assertEqual(get_stats()['hits'], 1)
+        token = re.search(
+            r'name="csrfmiddlewaretoken" value="([^"]+)"',
+            response.content.decode()).group(1)
+        response = client.post(self.FOLLOW_URL,
+                               {'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Follow.objects.exists())
+
+
+class PostsListingQueriesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.group = Group.objects.create(
+            title='test-group',
+            slug='test-slug',
+            description='test-description',
+        )
+        self.author = User.objects.create_user(username='test-author')
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.bulk_create(
+            Post(text=f'test-post {i}', author=self.author, group=self.group)
+            for i in range(10)
+        )
+        # На главной один раз загружаются подписки пользователя, дальше
+        # они берутся из кеша.
+        self.pages = {
+            INDEX_PAGE: 4,
+            reverse('posts:group_list', kwargs={
+                'slug': self.group.slug}): 3,
+            reverse('posts:profile', kwargs={
+                'username': self.author.username}): 4,
+            FOLLOW_PAGE: 3,
+        }
+
+    def test_listing_pages_have_constant_query_count(self):
+        # Реестр групп загружается один раз на процесс.
+        get_groups()
+        for page, queries in self.pages.items():
+            with self.subTest(page=page):
+                with self.assertNumQueries(queries):
+                    self.authorized_client.get(page)
+
+
+class GroupRegistryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+        self.group = Group.objects.create(title='test-group',
+                                          slug='test-slug')
+
+    def test_registry_follows_posts_and_groups(self):
+        self.assertEqual(get_group('test-slug').post_count, 0)
+        with self.assertNumQueries(0):
+            get_groups()
+        post = Post.objects.create(author=self.user, group=self.group,
+                                   text='test-post')
+        info = get_group('test-slug')
+        self.assertEqual(info.post_count, 1)
+        self.assertEqual(info.latest_post_at, post.pub_date)
+        post.group = None
+        post.save()
+        self.assertEqual(get_group('test-slug').post_count, 0)
+        self.group.title = 'renamed'
+        self.group.save()
+        self.assertEqual(str(get_group('test-slug')), 'renamed')
+        self.group.delete()
+        self.assertIsNone(get_group('test-slug'))
+
+    def test_new_post_refreshes_only_its_group_stats(self):
+        get_groups()
+        version = get_versions([GROUPS_NAMESPACE])
+        Post.objects.create(author=self.user, group=self.group,
+                            text='test-post')
+        self.assertEqual(get_versions([GROUPS_NAMESPACE]), version)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_group('test-slug').post_count, 1)
+        with self.assertNumQueries(0):
+            get_groups()
+
+    def test_group_index_lists_groups(self):
+        Post.objects.create(author=self.user, group=self.group,
+                            text='test-post')
+        response = self.client.get(reverse('posts:group_index'))
+        groups = list(response.context['groups'])
+        self.assertEqual([group.slug for group in groups], ['test-slug'])
+        self.assertEqual(groups[0].post_count, 1)
+        self.assertContains(response, reverse(
+            'posts:group_list', kwargs={'slug': 'test-slug'}))
+
+
+class FollowStateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.authors = [User.objects.create_user(username=f'author-{i}')
+                        for i in range(3)]
+        for author in self.authors:
+            Post.objects.create(author=author, text=f'{author} post')
+        Follow.objects.create(user=self.user, author=self.authors[0])
+
+    def test_follow_state_is_loaded_once_per_page(self):
+        response = self.authorized_client.get(INDEX_PAGE)
+        self.assertContains(response, 'Вы подписаны на автора', count=1)
+        Post.objects.bulk_create(
+            Post(author=author, text='more') for author in self.authors)
+        # bulk_create не шлёт сигналов: сбрасываем и кеш страниц.
+        cache.clear()
+        with self.assertNumQueries(4):
+            response = self.authorized_client.get(INDEX_PAGE)
+        self.assertContains(response, 'Вы подписаны на автора', count=2)
+
+    def test_follow_state_invalidated_on_follow(self):
+        self.authorized_client.get(INDEX_PAGE)
+        Follow.objects.create(user=self.user, author=self.authors[1])
+        response = self.authorized_client.get(INDEX_PAGE)
+        self.assertContains(response, 'Вы подписаны на автора', count=2)
+        Follow.objects.all().delete()
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': 'author-0'}))
+        self.assertFalse(response.context['following'])
+        self.assertNotContains(response, 'Вы подписаны на автора')
+
+
+class ConditionalPagesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.group = Group.objects.create(title='test-group',
+                                          slug='test-slug')
+        self.post = Post.objects.create(author=self.user, group=self.group,
+                                        text='test-post')
+        self.DETAIL_PAGE = reverse('posts:post_detail',
+                                   kwargs={'post_id': self.post.pk})
+
+    def test_unchanged_pages_return_not_modified(self):
+        pages = (
+            INDEX_PAGE,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'test-username'}),
+            self.DETAIL_PAGE,
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.client.get(page)
+                self.assertIn('Cookie', response['Vary'])
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertFalse(response.has_header('Last-Modified'))
+                etag = response['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(page,
+                                               HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_validators_follow_comments_and_user(self):
+        response = self.client.get(self.DETAIL_PAGE)
+        etag = response['ETag']
+        response = self.authorized_client.get(self.DETAIL_PAGE,
+                                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        Comment.objects.create(post=self.post, author=self.user, text='Ок')
+        response = self.client.get(self.DETAIL_PAGE, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Ок')
+
+    def test_etag_changes_with_csrf_cookie(self):
+        self.authorized_client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        etag = self.authorized_client.get(self.DETAIL_PAGE)['ETag']
+        response = self.authorized_client.get(self.DETAIL_PAGE,
+                                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.authorized_client.cookies[settings.CSRF_COOKIE_NAME] = 'b' * 64
+        response = self.authorized_client.get(self.DETAIL_PAGE,
+                                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_etag_changes_on_follow(self):
+        page = reverse('posts:profile', kwargs={'username': 'test-username'})
+        etag = self.client.get(page)['ETag']
+        reader = User.objects.create_user(username='test-reader')
+        Follow.objects.create(user=reader, author=self.user)
+        response = self.client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_listing_etag_changes_when_post_deleted(self):
+        Post.objects.create(author=self.user, text='second')
+        etag = self.client.get(INDEX_PAGE)['ETag']
+        Post.objects.filter(text='second').delete()
+        response = self.client.get(INDEX_PAGE, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(FEED_FANOUT=True, FEED_FANOUT_MAX_FOLLOWERS=1)
+class FollowFeedFanoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.author = User.objects.create_user(username='test-author')
+        self.old_post = Post.objects.create(author=self.author, text='old')
+
+    def get_feed(self):
+        return list(self.authorized_client.get(FOLLOW_PAGE).context[
+            'page_obj'])
+
+    def test_follow_backfills_and_unfollow_trims_feed(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='new')
+        self.assertEqual(FeedEntry.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.get_feed(), [new_post, self.old_post])
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.get_feed(), [])
+
+    def test_celebrity_posts_are_read_on_demand(self):
+        fan = User.objects.create_user(username='test-fan')
+        Follow.objects.create(user=fan, author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='new')
+        self.assertFalse(FeedEntry.objects.filter(post=new_post).exists())
+        self.assertEqual(self.get_feed(), [new_post, self.old_post])
+
+    def test_author_below_threshold_gets_missed_posts_fanned_out(self):
+        fan = User.objects.create_user(username='test-fan')
+        Follow.objects.create(user=fan, author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='new')
+        Follow.objects.filter(user=fan).delete()
+        self.assertTrue(FeedEntry.objects.filter(user=self.user,
+                                                 post=new_post).exists())
+        self.assertEqual(self.get_feed(), [new_post, self.old_post])
+
+    def test_feed_merges_entries_and_celebrity_posts_by_cursor(self):
+        fan = User.objects.create_user(username='test-fan')
+        celebrity = User.objects.create_user(username='test-celebrity')
+        Follow.objects.create(user=fan, author=celebrity)
+        Follow.objects.create(user=self.user, author=celebrity)
+        Follow.objects.create(user=self.user, author=self.author)
+        expected = [self.old_post]
+        for i in range(POSTS_ON_PAGE):
+            author = celebrity if i % 2 else self.author
+            expected.append(Post.objects.create(author=author, text=str(i)))
+        expected.reverse()
+        response = self.authorized_client.get(FOLLOW_PAGE)
+        first = response.context['page_obj']
+        self.assertEqual(list(first), expected[:POSTS_ON_PAGE])
+        response = self.authorized_client.get(
+            FOLLOW_PAGE, {'cursor': first.next_cursor})
+        second = response.context['page_obj']
+        self.assertEqual(list(second), expected[POSTS_ON_PAGE:])
+        self.assertFalse(second.has_next())
+        response = self.authorized_client.get(
+            FOLLOW_PAGE, {'cursor': second.previous_cursor})
+        self.assertEqual(list(response.context['page_obj']),
+                         expected[:POSTS_ON_PAGE])
+
+
+class PostCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+        self.post = Post.objects.create(author=self.user, text='test-post')
+
+    def render_card(self):
+        post = Post.objects.for_listing().get(pk=self.post.pk)
+        return render_to_string('posts/includes/post_card.html',
+                                {'post': post})
+
+    def test_card_rerendered_only_when_post_updated(self):
+        self.assertIn('test-post', self.render_card())
+        Post.objects.filter(pk=self.post.pk).update(text='silent-change')
+        self.assertIn('test-post', self.render_card())
+        self.post.text = 'test-post changed'
+        self.post.save()
+        self.assertIn('test-post changed', self.render_card())
+
+    def test_card_follows_author_and_group_renames(self):
+        group = Group.objects.create(title='test-group', slug='test-slug')
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        self.render_card()
+        self.user.first_name, self.user.last_name = 'Лев', 'Толстой'
+        self.user.save()
+        group.title = 'renamed-group'
+        group.save()
+        card = self.render_card()
+        self.assertIn('Лев Толстой', card)
+        self.assertIn('renamed-group', card)
+
+
+@override_settings(THUMBNAIL_ASYNC=False)
+@mock.patch('posts.thumbnails.generate')
+class PostThumbnailScheduleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+
+    def test_sync_thumbnails_wait_for_commit(self, generate):
+        Post.objects.create(author=self.user, text='test-post',
+                            image='posts/new.gif')
+        generate.assert_not_called()
+        for savepoints, callback in connection.run_on_commit:
+            callback()
+        generate.assert_called_once_with('posts/new.gif')
+
+    @mock.patch('posts.thumbnails.transaction.on_commit',
+                lambda callback: callback())
+    def test_only_new_image_is_processed(self, generate):
+        post = Post.objects.create(author=self.user, text='test-post',
+                                   image='posts/new.gif')
+        post.text = 'test-post changed'
+        post.save()
+        generate.assert_called_once_with('posts/new.gif')
+        post.image = 'posts/other.gif'
+        post.save()
+        generate.assert_called_with('posts/other.gif')
+
+    @mock.patch('posts.thumbnails.transaction.on_commit',
+                lambda callback: callback())
+    def test_failed_thumbnail_is_logged_and_not_retried(self, generate):
+        generate.side_effect = OSError('broken image')
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            Post.objects.create(author=self.user, text='test-post',
+                                image='posts/broken.gif')
+        post = Post.objects.for_listing().get()
+        for _ in range(3):
+            card = render_to_string('posts/includes/post_card.html',
+                                    {'post': post})
+        self.assertIn('placeholder.svg', card)
+        generate.assert_called_once()
+
+
+@override_settings(THUMBNAIL_ASYNC=True)
+class PostThumbnailAsyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='test-username')
+        self.post = Post.objects.create(author=user, text='test-post',
+                                        image='posts/pending.gif')
+        self.addCleanup(thumbnails._pending.clear)
+
+    @mock.patch('posts.thumbnails.transaction.on_commit',
+                lambda callback: callback())
+    @mock.patch('posts.thumbnails._get_executor')
+    def test_placeholder_shown_while_thumbnail_pending(self, executor):
+        response = self.client.get(INDEX_PAGE)
+        self.assertContains(response, 'placeholder.svg')
+        cache.clear()
+        self.client.get(INDEX_PAGE)
+        executor.return_value.submit.assert_called_once()
+
+
+class PostsSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test-username')
+        self.post = Post.objects.create(author=self.user,
+                                        text='Кошки <b>любят</b> молоко')
+        Post.objects.create(author=self.user, text='Собаки любят кости')
+        self.SEARCH_PAGE = reverse('posts:search')
+
+    def test_search_finds_and_highlights_posts(self):
+        response = self.client.get(self.SEARCH_PAGE, {'q': 'кошки'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), [self.post])
+        self.assertContains(response, '<mark>Кошки</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+
+    def test_search_index_follows_post_changes(self):
+        self.post.text = 'Кошки спят'
+        self.post.save()
+        response = self.client.get(self.SEARCH_PAGE, {'q': 'молоко'})
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.post.delete()
+        response = self.client.get(self.SEARCH_PAGE, {'q': 'кошки'})
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_search_pages_by_cursor(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'любят {i}')
+            for i in range(POSTS_ON_PAGE)
+        )
+        get_search_backend().rebuild()
+        response = self.client.get(self.SEARCH_PAGE, {'q': 'любят'})
+        page_1 = response.context['page_obj']
+        self.assertEqual(len(page_1), POSTS_ON_PAGE)
+        response = self.client.get(
+            self.SEARCH_PAGE, {'q': 'любят', 'cursor': page_1.next_cursor})
+        page_2 = response.context['page_obj']
+        self.assertEqual(len(page_2), 2)
+        self.assertFalse(set(page_1) & set(page_2))
+
+    def test_backend_follows_database_vendor(self):
+        self.assertIsInstance(get_search_backend(), Fts5Backend)
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            backend = get_search_backend()
+            self.assertIsInstance(backend, LikeBackend)
+            Post.objects.create(author=self.user, text='Кошки на крыше')
+        self.assertEqual(
+            backend.filter(Post.objects.all(), 'крыше').count(), 1)
+
+    def test_admin_search_uses_index(self):
+        posts = Fts5Backend().filter(Post.objects.all(), 'молоко')
+        self.assertEqual(list(posts), [self.post])
+        self.assertFalse(Fts5Backend().filter(Post.objects.all(), ' '))
+
+
+class PostCommentsPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+        self.post = Post.objects.create(author=self.user, text='test-post')
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'comment {i}')
+            for i in range(COMMENTS_ON_PAGE + 5)
+        )
+        self.DETAIL_PAGE = reverse('posts:post_detail',
+                                   kwargs={'post_id': self.post.pk})
+        self.COMMENTS_PAGE = reverse('posts:post_comments',
+                                     kwargs={'post_id': self.post.pk})
+
+    def test_post_detail_shows_first_comments_page(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.DETAIL_PAGE)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_ON_PAGE)
+        self.assertTrue(comments.has_next())
+        self.assertEqual(comments[0].text, 'comment 0')
+        self.assertContains(response, self.COMMENTS_PAGE)
+
+    def test_comments_fragment_loads_next_page(self):
+        first = self.client.get(self.DETAIL_PAGE).context['comments']
+        response = self.client.get(self.COMMENTS_PAGE,
+                                   {'cursor': first.next_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 5)
+        self.assertFalse(comments.has_next())
+        self.assertFalse(set(first) & set(comments))
+
+    def test_comments_json(self):
+        response = self.client.get(self.COMMENTS_PAGE, {'format': 'json'})
+        data = response.json()
+        self.assertEqual(len(data['comments']), COMMENTS_ON_PAGE)
+        self.assertEqual(data['comments'][0]['author']['username'],
+                         self.user.username)
+        self.assertIsNotNone(data['next_cursor'])
+        response = self.client.get(self.COMMENTS_PAGE, {
+            'format': 'json', 'cursor': data['next_cursor']})
+        self.assertIsNone(response.json()['next_cursor'])
+
+    def test_comments_of_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(COMMENTS_WRITE_BEHIND=True, COMMENTS_FLUSH_SIZE=2)
+@mock.patch('posts.comment_buffer._start_flusher')
+class CommentWriteBehindTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+        self.post = Post.objects.create(author=self.user, text='test-post')
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.DETAIL_PAGE = reverse('posts:post_detail',
+                                   kwargs={'post_id': self.post.pk})
+        self.COMMENT_PAGE = reverse('posts:add_comment',
+                                    kwargs={'post_id': self.post.pk})
+        self.addCleanup(comment_buffer._buffer.clear)
+
+    def test_author_sees_pending_comment_before_flush(self, start_flusher):
+        self.client.get(self.DETAIL_PAGE)
+        # С CSRF-cookie страница автора попадает в кеш.
+        self.author_client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        self.author_client.get(self.DETAIL_PAGE)
+        self.author_client.post(self.COMMENT_PAGE, {'text': 'В очереди'})
+        start_flusher.assert_called_once()
+        self.assertFalse(Comment.objects.exists())
+        response = self.author_client.get(self.DETAIL_PAGE)
+        self.assertContains(response, 'В очереди')
+        self.assertContains(response, 'скоро появится')
+        self.assertNotContains(self.client.get(self.DETAIL_PAGE),
+                               'В очереди')
+        self.assertEqual(comment_buffer.flush(), 1)
+        self.assertEqual(self.user.stats.comments_count, 1)
+        self.assertContains(self.client.get(self.DETAIL_PAGE), 'В очереди')
+        response = self.author_client.get(self.DETAIL_PAGE)
+        self.assertNotContains(response, 'скоро появится')
+
+    def test_flush_writes_batches_and_invalidates_once(self, start_flusher):
+        for i in range(3):
+            self.author_client.post(self.COMMENT_PAGE, {'text': f'№{i}'})
+        invalidations = get_stats()['invalidations']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(comment_buffer.flush(), 2)
+        inserts = [query for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(get_stats()['invalidations'], invalidations + 1)
+        comment_buffer.flush_all()
+        self.assertEqual(Comment.objects.count(), 3)
+        self.assertEqual(comment_buffer.flush(), 0)
+
+    def test_failed_flush_keeps_comments_and_their_dates(self, flusher):
+        self.author_client.post(self.COMMENT_PAGE, {'text': 'Ждёт'})
+        queued_at = comment_buffer._buffer[0].pub_date
+        with mock.patch.object(Comment.objects, 'bulk_create',
+                               side_effect=OperationalError('locked')):
+            with self.assertRaises(OperationalError):
+                comment_buffer.flush()
+        self.assertEqual(len(comment_buffer._buffer), 1)
+        self.assertContains(self.author_client.get(self.DETAIL_PAGE), 'Ждёт')
+        self.assertEqual(comment_buffer.flush(), 1)
+        self.assertEqual(Comment.objects.get().pub_date, queued_at)
+
+    def test_pending_comment_is_shared_between_processes(self, flusher):
+        self.author_client.post(self.COMMENT_PAGE, {'text': 'Из другого'})
+        # Другой процесс видит только общий кеш, а не буфер этого.
+        with mock.patch.object(comment_buffer, '_buffer', []):
+            response = self.author_client.get(self.DETAIL_PAGE)
+        self.assertContains(response, 'Из другого')
+
+    def test_comment_to_missing_post(self, start_flusher):
+        response = self.author_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': 0}),
+            {'text': 'Некуда'})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(comment_buffer._buffer)
+
+
+class SyndicationFeedsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test-username')
+        self.group = Group.objects.create(title='test-group',
+                                          slug='test-slug',
+                                          description='test-description')
+        self.post = Post.objects.create(author=self.user, group=self.group,
+                                        text='Пост в ленте')
+        Post.objects.create(author=self.user, text='Пост без группы')
+        self.feeds = {
+            reverse('posts:feed_rss'): 2,
+            reverse('posts:feed_atom'): 2,
+            reverse('posts:group_feed_rss', kwargs={'slug': 'test-slug'}): 1,
+            reverse('posts:group_feed_atom',
+                    kwargs={'slug': 'test-slug'}): 1,
+            reverse('posts:author_feed_rss',
+                    kwargs={'username': 'test-username'}): 2,
+            reverse('posts:author_feed_atom',
+                    kwargs={'username': 'test-username'}): 2,
+        }
+
+    def test_feeds_list_posts(self):
+        for url, count in self.feeds.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                content = response.content.decode()
+                tag = '<entry>' if 'atom' in url else '<item>'
+                self.assertEqual(content.count(tag), count)
+                self.assertIn('Пост в ленте', content)
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_feed_updates_after_new_post(self):
+        url = reverse('posts:group_feed_atom', kwargs={'slug': 'test-slug'})
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(author=self.user, group=self.group,
+                            text='Свежий пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Свежий пост')
+
+    def test_missing_group_feed(self):
+        response = self.client.get(
+            reverse('posts:group_feed_rss', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+
+
+class PostsBenchmarkTests(TestCase):
+    def test_bench_views_covers_every_url(self):
+        call_command('seed_data', posts=30, users=3, stdout=StringIO())
+        output = tempfile.NamedTemporaryFile(suffix='.json')
+        self.addCleanup(output.close)
+        call_command('bench_views', requests=2, output=output.name,
+                     stdout=StringIO())
+        with open(output.name, encoding='utf-8') as report_file:
+            report = json.load(report_file)
+        names = {name.split()[1] for name in report['results']}
+        self.assertEqual(names, {url.name for url in urlpatterns})
+        for row in report['results'].values():
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+        self.assertEqual(Post.objects.count(), 30)
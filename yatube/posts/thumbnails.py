@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from .cache import invalidate_post
+
+logger = logging.getLogger(__name__)
+
+Profile = namedtuple('Profile', ('widths', 'ratio', 'sizes'))
+
+# Профили миниатюр: набор ширин для srcset, пропорция кадра и атрибут
+# sizes, подсказывающий браузеру ширину картинки в вёрстке.
+PROFILES: dict = {
+    'card': Profile(widths=(320, 640, 960, 1920), ratio=339 / 960,
+                    sizes='(min-width: 992px) 960px, 100vw'),
+}
+# Первый формат отдаётся через <source>, последний — запасной для <img>.
+FORMATS: tuple = ('WEBP', 'JPEG')
+FALLBACK_WIDTH: int = 960
+OPTIONS: dict = {'crop': 'center', 'upscale': True}
+URL_KEY: str = 'posts:thumbnails:{}'
+FAILED_KEY: str = 'posts:thumbnails_failed:{}'
+# Сколько секунд не пытаться снова создать миниатюры битой картинки.
+RETRY_AFTER: int = 10 * 60
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _url_key(name, key=URL_KEY):
+    return key.format(hashlib.md5(name.encode()).hexdigest())
+
+
+def cached_set(name):
+    """Готовые миниатюры: {профиль: {формат: [(ширина, url), ...]}}."""
+    return cache.get(_url_key(name))
+
+
+def remember(name, thumbnail_set):
+    cache.set(_url_key(name), thumbnail_set, None)
+
+
+def failed(name):
+    """Недавно ли не удалось создать миниатюры этой картинки."""
+    return cache.get(_url_key(name, FAILED_KEY)) is not None
+
+
+def widths_for(profile, source_width):
+    # Ширины больше исходной картинки не дают браузеру ничего нового.
+    widths = [width for width in profile.widths if width <= source_width]
+    return widths or [min(profile.widths)]
+
+
+def make_thumbnail(name):
+    with default_storage.open(name) as file:
+        source_width = Image.open(file).size[0]
+    thumbnail_set = {}
+    for profile_name, profile in PROFILES.items():
+        variants = thumbnail_set[profile_name] = {}
+        for image_format in FORMATS:
+            variants[image_format] = [
+                (width, get_thumbnail(
+                    name, f'{width}x{round(width * profile.ratio)}',
+                    format=image_format, **OPTIONS
+                ).url)
+                for width in widths_for(profile, source_width)
+            ]
+    return name, thumbnail_set
+
+
+def generate(name):
+    name, thumbnail_set = make_thumbnail(name)
+    remember(name, thumbnail_set)
+    return thumbnail_set
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def _generate(name, on_ready):
+    try:
+        generate(name)
+        if on_ready is not None:
+            on_ready()
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+        # Иначе каждый показ страницы заново открывал бы битый файл.
+        cache.set(_url_key(name, FAILED_KEY), True, RETRY_AFTER)
+
+
+def _run(name, on_ready):
+    # Поток пула живёт долго: соединение с БД закрывается по CONN_MAX_AGE
+    # и после ошибок так же, как в начале и конце веб-запроса.
+    close_old_connections()
+    try:
+        _generate(name, on_ready)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        close_old_connections()
+
+
+def _submit(name, on_ready):
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    _get_executor().submit(_run, name, on_ready)
+
+
+def schedule(name, on_ready=None):
+    """Создаёт миниатюры после фиксации текущей транзакции.
+
+    Фоновый поток работает со своим соединением и не увидит данных из
+    незафиксированной транзакции, а в синхронном режиме обработка
+    картинки не должна держать транзакцию сохранения открытой. Вне
+    транзакции on_commit выполняет задачу сразу. Ошибки пишутся в лог.
+    """
+    if settings.THUMBNAIL_ASYNC:
+        transaction.on_commit(lambda: _submit(name, on_ready))
+    else:
+        transaction.on_commit(lambda: _generate(name, on_ready))
+
+
+def schedule_for(post):
+    # Страницы с постом могли попасть в кеш с заглушкой вместо картинки.
+    return schedule(post.image.name, on_ready=lambda: invalidate_post(post))
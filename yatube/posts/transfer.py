@@ -0,0 +1,252 @@
+import csv
+import json
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post, User
+from .seed import explicit_pub_dates
+
+BATCH_SIZE: int = 5000
+FORMATS: tuple = ('jsonl', 'csv')
+# Порядок важен: при импорте группы и посты должны появиться раньше
+# ссылающихся на них записей.
+FIELDS: dict = {
+    'group': ('slug', 'title', 'description'),
+    'post': ('id', 'author', 'group', 'text', 'pub_date', 'image'),
+    'comment': ('id', 'post', 'author', 'text', 'pub_date'),
+    'follow': ('user', 'author'),
+}
+COLUMNS: tuple = ('model',) + tuple(dict.fromkeys(
+    field for fields in FIELDS.values() for field in fields
+))
+EXPORT_QUERIES: dict = {
+    'group': (Group, ('slug', 'title', 'description')),
+    'post': (Post, ('id', 'author__username', 'group__slug', 'text',
+                    'pub_date', 'image')),
+    'comment': (Comment, ('id', 'post_id', 'author__username', 'text',
+                          'pub_date')),
+    'follow': (Follow, ('user__username', 'author__username')),
+}
+
+
+def export_records(models=tuple(FIELDS), chunk_size=BATCH_SIZE):
+    for name in FIELDS:
+        if name not in models:
+            continue
+        model, values = EXPORT_QUERIES[name]
+        rows = model.objects.order_by('pk').values_list(*values)
+        for row in rows.iterator(chunk_size=chunk_size):
+            record = {'model': name}
+            record.update(zip(FIELDS[name], row))
+            if 'pub_date' in record:
+                record['pub_date'] = record['pub_date'].isoformat()
+            yield record
+
+
+def write_records(records, file, format):
+    if format == 'csv':
+        writer = csv.DictWriter(file, COLUMNS)
+        writer.writeheader()
+    count = 0
+    for record in records:
+        if format == 'csv':
+            writer.writerow(record)
+        else:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def read_records(file, format):
+    if format == 'csv':
+        for row in csv.DictReader(file):
+            record = {'model': row['model']}
+            record.update(
+                (field, row[field]) for field in FIELDS[row['model']]
+            )
+            # В CSV нет null: пустая ячейка означает пост без группы.
+            if record.get('group') == '':
+                record['group'] = None
+            yield record
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+class Importer:
+    """Загружает записи пачками.
+
+    Посты и комментарии сохраняют id из выгрузки, если он свободен, иначе
+    получают новый, и ссылки комментариев на посты переписываются. Записи,
+    уже загруженные прошлым импортом, пропускаются. В памяти хранятся
+    только заменённые id постов, поэтому она не растёт с размером выгрузки.
+    """
+
+    # Поля, по которым запись считается уже загруженной.
+    IDENTITY: dict = {
+        'post': ('author_id', 'pub_date'),
+        'comment': ('post_id', 'author_id', 'pub_date'),
+    }
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.imported = dict.fromkeys(FIELDS, 0)
+        self.skipped = dict.fromkeys(FIELDS, 0)
+        # id поста из выгрузки -> другой id, полученный в этой БД.
+        self.post_ids = {}
+        self.next_ids = {}
+
+    def run(self, records):
+        name, batch = None, []
+        with explicit_pub_dates(Post, Comment):
+            for record in records:
+                if record['model'] not in FIELDS:
+                    raise ValueError(f'Неизвестная модель {record["model"]}')
+                if batch and (record['model'] != name
+                              or len(batch) >= self.batch_size):
+                    self.flush(name, batch)
+                    batch = []
+                name = record['model']
+                batch.append(record)
+            if batch:
+                self.flush(name, batch)
+        self.reset_sequences()
+        return self.imported
+
+    def flush(self, name, batch):
+        objects = getattr(self, f'build_{name}s')(batch)
+        if objects:
+            # Конфликты уже отфильтрованы при сборке пачки; ignore_conflicts
+            # нужен только группам и подпискам на случай гонки с сайтом.
+            objects[0].__class__.objects.bulk_create(
+                objects, ignore_conflicts=name in ('group', 'follow')
+            )
+        self.imported[name] += len(objects)
+        self.skipped[name] += len(batch) - len(objects)
+
+    def allocate_id(self, model, reserved):
+        if model not in self.next_ids:
+            self.next_ids[model] = (model.objects.aggregate(
+                last=Max('pk'))['last'] or 0) + 1
+        while self.next_ids[model] in reserved:
+            self.next_ids[model] += 1
+        self.next_ids[model] += 1
+        return self.next_ids[model] - 1
+
+    def assign_ids(self, name, model, records, objects, remap=None):
+        identity = self.IDENTITY[name]
+        source_ids = [int(record['id']) for record in records]
+        # Уже загруженные записи ищутся по содержимому, а не по id: при
+        # прошлом импорте их id мог быть заменён.
+        loaded = {row[1:]: row[0] for row in model.objects.filter(
+            pub_date__in={obj.pub_date for obj in objects}
+        ).values_list('pk', *identity)}
+        taken = set(model.objects.filter(
+            pk__in=source_ids).values_list('pk', flat=True))
+        new = []
+        for source_id, obj in zip(source_ids, objects):
+            key = tuple(getattr(obj, field) for field in identity)
+            if key in loaded:
+                obj.pk = loaded[key]
+            elif source_id in taken:
+                obj.pk = self.allocate_id(model, set(source_ids))
+                new.append(obj)
+            else:
+                obj.pk = source_id
+                new.append(obj)
+            if remap is not None and obj.pk != source_id:
+                remap[source_id] = obj.pk
+        return new
+
+    def resolve_users(self, usernames):
+        usernames = set(usernames)
+        users = dict(User.objects.filter(
+            username__in=usernames
+        ).values_list('username', 'pk'))
+        missing = usernames - set(users)
+        if missing:
+            # Авторы переносятся без паролей: войти можно будет только
+            # после сброса пароля.
+            User.objects.bulk_create([
+                User(username=username, password=make_password(None))
+                for username in missing
+            ], ignore_conflicts=True)
+            users.update(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'pk'))
+        return users
+
+    def build_groups(self, batch):
+        existing = set(Group.objects.filter(slug__in={
+            record['slug'] for record in batch
+        }).values_list('slug', flat=True))
+        return [Group(slug=record['slug'], title=record['title'],
+                      description=record['description'])
+                for record in batch if record['slug'] not in existing]
+
+    def build_posts(self, batch):
+        users = self.resolve_users(record['author'] for record in batch)
+        groups = dict(Group.objects.filter(slug__in={
+            record['group'] for record in batch if record['group']
+        }).values_list('slug', 'pk'))
+        posts = [
+            Post(author_id=users[record['author']],
+                 group_id=groups.get(record['group']),
+                 text=record['text'],
+                 pub_date=parse_datetime(record['pub_date']),
+                 image=record['image'] or '')
+            for record in batch
+        ]
+        return self.assign_ids('post', Post, batch, posts,
+                               remap=self.post_ids)
+
+    def build_comments(self, batch):
+        # Посты выгружаются раньше своих комментариев, поэтому пост уже
+        # есть в БД под прежним или заменённым id; комментарии к постам,
+        # которых нет, пропускаются.
+        post_ids = {
+            int(record['post']): self.post_ids.get(int(record['post']),
+                                                   int(record['post']))
+            for record in batch
+        }
+        existing = set(Post.objects.filter(
+            pk__in=set(post_ids.values())).values_list('pk', flat=True))
+        batch = [record for record in batch
+                 if post_ids[int(record['post'])] in existing]
+        users = self.resolve_users(record['author'] for record in batch)
+        return self.assign_ids('comment', Comment, batch, [
+            Comment(post_id=post_ids[int(record['post'])],
+                    author_id=users[record['author']],
+                    text=record['text'],
+                    pub_date=parse_datetime(record['pub_date']))
+            for record in batch
+        ])
+
+    def build_follows(self, batch):
+        users = self.resolve_users(
+            username for record in batch
+            for username in (record['user'], record['author'])
+        )
+        pairs = {(users[record['user']], users[record['author']])
+                 for record in batch if record['user'] != record['author']}
+        existing = set(Follow.objects.filter(
+            user_id__in={user for user, _ in pairs},
+            author_id__in={author for _, author in pairs},
+        ).values_list('user_id', 'author_id'))
+        return [Follow(user_id=user, author_id=author)
+                for user, author in pairs - existing]
+
+    def reset_sequences(self):
+        # Посты и комментарии создаются с явными id, поэтому счётчики
+        # автоинкремента нужно сдвинуть за максимальный id.
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Post, Comment]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
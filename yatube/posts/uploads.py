@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import thumbnails
+from .cache import invalidate_post
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# UploadedFile отбрасывает каталоги из имени, поэтому исходники
+# помечаются префиксом имени, а не отдельным каталогом.
+STAGING_PREFIX: str = 'incoming-'
+EXTENSIONS: dict = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+_executor = None
+_lock = threading.Lock()
+
+
+def staged_name(name):
+    """Имя для исходного файла: он хранится, пока его не обработают."""
+    extension = os.path.splitext(name)[1].lower()
+    return f'{STAGING_PREFIX}{uuid.uuid4().hex}{extension}'
+
+
+def is_staged(name):
+    return os.path.basename(name).startswith(STAGING_PREFIX)
+
+
+def encode(file):
+    """Уменьшает картинку и перекодирует её без метаданных."""
+    image = Image.open(file)
+    # Поворот из EXIF применяется до того, как EXIF будет отброшен.
+    image = ImageOps.exif_transpose(image)
+    max_side = settings.UPLOAD_MAX_SIDE
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    image_format = settings.UPLOAD_IMAGE_FORMAT
+    transparent = image.mode in ('RGBA', 'LA', 'PA') or (
+        'transparency' in image.info)
+    if transparent and image_format != 'JPEG':
+        image = image.convert('RGBA')
+    else:
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=settings.UPLOAD_IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def store(data):
+    """Кладёт файл по хешу содержимого: одинаковые картинки — один файл."""
+    digest = hashlib.sha256(data).hexdigest()
+    extension = EXTENSIONS[settings.UPLOAD_IMAGE_FORMAT]
+    name = f'posts/{digest[:2]}/{digest}.{extension}'
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, ContentFile(data))
+        if saved != name:
+            # Тот же файл одновременно сохранил другой обработчик.
+            default_storage.delete(saved)
+    return name
+
+
+def process(post_id, name):
+    with default_storage.open(name) as file:
+        data = encode(file)
+    final_name = store(data)
+    # Пока картинка обрабатывалась, автор мог заменить её или удалить пост.
+    updated = Post.objects.filter(pk=post_id, image=name).update(
+        image=final_name, updated=timezone.now()
+    )
+    default_storage.delete(name)
+    if updated:
+        post = Post.objects.select_related('author', 'group').get(pk=post_id)
+        invalidate_post(post)
+        thumbnails.schedule_for(post)
+    return final_name
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.UPLOAD_WORKERS,
+                thread_name_prefix='uploads',
+            )
+    return _executor
+
+
+def _run(post_id, name):
+    # Соединения потока живут по CONN_MAX_AGE, как в веб-запросах.
+    close_old_connections()
+    try:
+        process(post_id, name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+    finally:
+        close_old_connections()
+
+
+def schedule(post):
+    if not settings.UPLOAD_ASYNC:
+        return process(post.pk, post.image.name)
+    post_id, name = post.pk, post.image.name
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run, post_id, name))
+    return None
@@ -5,15 +5,30 @@ from . import views
 app_name = 'posts'
 
 urlpatterns = [
+    path('groups/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/rss/', views.group_feed_rss,
+         name='group_feed_rss'),
+    path('group/<slug:slug>/atom/', views.group_feed_atom,
+         name='group_feed_atom'),
     path('', views.index, name='index'),
+    path('rss/', views.feed_rss, name='feed_rss'),
+    path('atom/', views.feed_atom, name='feed_atom'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/rss/', views.author_feed_rss,
+         name='author_feed_rss'),
+    path('profile/<str:username>/atom/', views.author_feed_atom,
+         name='author_feed_atom'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('create/', views.post_create, name='post_create'),
+    path('search/', views.search, name='search'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/bulk/', views.follow_bulk, name='follow_bulk'),
     path('profile/<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('profile/<str:username>/unfollow/', views.profile_unfollow,
@@ -1,14 +1,116 @@
-from django.core.paginator import Paginator
+from django.core import signing
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
 POSTS_ON_PAGE: int = 10
+COMMENTS_ON_PAGE: int = 20
+FOLLOW_BULK_LIMIT: int = 100
+CURSOR_SALT: str = 'posts.cursor'
+KEYSET_ORDERING: tuple = ('-pub_date', '-id')
+
+
+class CursorPage(Page):
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(
+            self.object_list[0], reverse=True
+        )
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинатор по паре (pub_date, id) без COUNT(*) и OFFSET."""
+
+    def __init__(self, object_list, per_page, descending=True):
+        self.descending = descending
+        ordering = KEYSET_ORDERING if descending else tuple(
+            field.lstrip('-') for field in KEYSET_ORDERING
+        )
+        super().__init__(object_list.order_by(*ordering), per_page)
+
+    def encode_cursor(self, obj, reverse=False):
+        return signing.dumps(
+            [obj.pub_date.isoformat(), obj.pk, int(reverse)],
+            salt=CURSOR_SALT,
+            compress=True,
+        )
+
+    def decode_cursor(self, cursor):
+        try:
+            pub_date, pk, reverse = signing.loads(cursor, salt=CURSOR_SALT)
+            pub_date = parse_datetime(pub_date)
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+        if pub_date is None:
+            return None
+        return pub_date, pk, bool(reverse)
+
+    def _beyond(self, pub_date, pk, reverse):
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        return (Q(**{f'pub_date__{lookup}': pub_date})
+                | Q(pub_date=pub_date, **{f'pk__{lookup}': pk}))
+
+    def cursor_page(self, cursor=None):
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self._forward(self.object_list, after=False)
+        pub_date, pk, reverse = position
+        queryset = self.object_list.filter(
+            self._beyond(pub_date, pk, reverse)
+        )
+        if reverse:
+            return self._backward(queryset)
+        return self._forward(queryset, after=True)
+
+    def _forward(self, queryset, after):
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], self, has_next, after)
+
+    def _backward(self, queryset):
+        rows = list(queryset.reverse()[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return CursorPage(rows, self, True, has_previous)
 
 
 def paginator(request, object):
-    paginator = Paginator(object, POSTS_ON_PAGE)
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if page_number is not None:
+        paginator = Paginator(object.order_by(*KEYSET_ORDERING),
+                              POSTS_ON_PAGE)
+        page_obj = paginator.get_page(page_number)
+    else:
+        paginator = CursorPaginator(object, POSTS_ON_PAGE)
+        page_obj = paginator.cursor_page(request.GET.get('cursor'))
     return {
         'paginator': paginator,
         'page_number': page_number,
         'page_obj': page_obj,
     }
+
+
+def comments_page(request, comments):
+    paginator = CursorPaginator(comments, COMMENTS_ON_PAGE, descending=False)
+    return paginator.cursor_page(request.GET.get('cursor'))
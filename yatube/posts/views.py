@@ -1,23 +1,63 @@
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
+
+from core.db import use_primary
 
+from . import comment_buffer
+from .cache import cached_page, get_versions
+from .conditional import conditional, conditional_page
+from .feed import follow_page
+from .following import is_following
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import paginator
+from .groups import GROUPS_NAMESPACE, get_group, get_groups
+from .models import Comment, Follow, Post, User, get_author_stats
+from .search import SearchPaginator
+from .syndication import (AuthorPostsAtomFeed, AuthorPostsFeed,
+                          GroupPostsAtomFeed, GroupPostsFeed, PostsAtomFeed,
+                          PostsFeed)
+from .utils import FOLLOW_BULK_LIMIT, comments_page, paginator
+
+
+def page_state(request, *namespaces):
+    # Те же версии, что у cached_page: страница в кеше и ETag меняются
+    # от одних и тех же сигналов, а проверка не ходит в БД. Как и в ключе
+    # cached_page, у вошедшего учитывается CSRF-cookie: после её смены
+    # 304 оставил бы в браузере форму со старым токеном.
+    csrf_cookie = ''
+    if request.user.is_authenticated:
+        csrf_cookie = request.META.get('CSRF_COOKIE') or ''
+    return request.user.pk, csrf_cookie, *get_versions(namespaces)
 
-WAIT_TIME_SEC: int = 20
 
+def index_state(request):
+    return page_state(request, 'posts', f'follow:{request.user.pk}')
 
-@cache_page(WAIT_TIME_SEC, key_prefix='index_page')
+
+@conditional_page(index_state)
+@cached_page('posts', 'follow:{user_id}')
 def index(request):
-    post_list = paginator(request, Post.objects.all())
+    post_list = paginator(request, Post.objects.for_listing())
     return render(request, 'posts/index.html', post_list)
 
 
+def group_state(request, slug):
+    return page_state(request, f'group:{slug}', f'follow:{request.user.pk}')
+
+
+@conditional_page(group_state)
+@cached_page('group:{slug}', 'follow:{user_id}')
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = get_group(slug)
+    if group is None:
+        raise Http404
+    posts = Post.objects.for_listing().filter(group_id=group.id)
     context = {
         'group': group,
         'posts': posts,
@@ -26,36 +66,103 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+def group_index_state(request):
+    # Счётчики групп меняются с каждым постом, а его правка поднимает posts.
+    return page_state(request, GROUPS_NAMESPACE, 'posts')
+
+
+@conditional_page(group_index_state)
+def group_index(request):
+    return render(request, 'posts/group_index.html', {
+        'groups': get_groups().values(),
+    })
+
+
+def profile_state(request, username):
+    return page_state(request, f'author:{username}')
+
+
+@conditional_page(profile_state)
+@cached_page('author:{username}')
 def profile(request, username):
-    username = get_object_or_404(User, username=username)
-    posts_count = username.posts.all().count
-    if request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=username
-    ).exists():
-        following = True
-    else:
-        following = False
+    username = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = get_author_stats(username)
     context = {
         'username': username,
-        'posts_count': posts_count,
-        'following': following,
+        'posts_count': stats.posts_count,
+        'stats': stats,
+        'following': is_following(request, username),
     }
-    context.update(paginator(request, username.posts.all()))
+    context.update(paginator(request, username.posts.for_listing()))
     return render(request, 'posts/profile.html', context)
 
 
+def post_detail_state(request, post_id):
+    pending = [comment.pub_date for comment in
+               comment_buffer.pending(post_id, request.user)]
+    return (*page_state(request, 'posts', f'post:{post_id}'), *pending)
+
+
+@conditional_page(post_detail_state)
+@cached_page('posts', 'post:{post_id}')
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
     form = CommentForm()
     context = {
         'post': post,
-        'comments': post.comments.all(),
+        'posts_count': get_author_stats(post.author).posts_count,
+        'comments': comments_page(
+            request, Comment.objects.for_listing().filter(post=post)
+        ),
+        'pending_comments': comment_buffer.pending(post.pk, request.user),
         'form': form,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@cached_page('post:{post_id}')
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = comments_page(
+        request, Comment.objects.for_listing().filter(post_id=post_id)
+    )
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [{
+                'id': comment.pk,
+                'author': {
+                    'username': comment.author.username,
+                    'full_name': comment.author.get_full_name(),
+                },
+                'text': comment.text,
+                'pub_date': comment.pub_date.isoformat(),
+            } for comment in comments],
+            'next_cursor': comments.next_cursor,
+        })
+    return render(request, 'posts/includes/comment_list.html', {
+        'comments': comments,
+        'post_id': post_id,
+    })
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    context = {'query': query}
+    if query:
+        context['page_obj'] = SearchPaginator(query).cursor_page(
+            request.GET.get('cursor')
+        )
+        context['page_params'] = urlencode({'q': query}) + '&'
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@use_primary
 def post_create(request):
     username = request.user.username
     if request.method == 'POST':
@@ -73,6 +180,7 @@ def post_create(request):
     return render(request, 'posts/create_post.html', {'form': form})
 
 
+@use_primary
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = PostForm(
@@ -95,50 +203,144 @@ def post_edit(request, post_id):
 
 
 @login_required
+@use_primary
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = post
-        comment.save()
+        comment.post_id = post_id
+        if settings.COMMENTS_WRITE_BEHIND:
+            comment_buffer.enqueue(comment)
+        else:
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def follow_state(request):
+    return page_state(request, 'posts', f'follow:{request.user.pk}')
+
+
 @login_required
+@conditional_page(follow_state)
+@cached_page('posts', 'follow:{user_id}')
 def follow_index(request):
-    post_list = paginator(request, Post.objects.filter(
-        author__following__user=request.user)
-    )
-    return render(request, 'posts/follow.html', post_list)
+    return render(request, 'posts/follow.html', follow_page(request))
+
+
+def wants_json(request):
+    return (request.GET.get('format') == 'json'
+            or 'application/json' in request.META.get('HTTP_ACCEPT', ''))
+
+
+def follow_response(request, username, following):
+    if wants_json(request):
+        return JsonResponse({'author': username, 'following': following})
+    return redirect('posts:profile', username)
 
 
 @login_required
+@require_POST
+@use_primary
 def profile_follow(request, username):
-    user = request.user
-    username = get_object_or_404(User, username=username)
-    following = Follow.objects.filter(user=user, author=username)
-    if user != username and not following.exists():
-        Follow.objects.create(user=user, author=username)
-    context = {
-        'username': username,
-        'following': following,
-    }
-    context.update(paginator(request, username.posts.all()))
-    return render(request, 'posts/profile.html', context)
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        raise Http404
+    if author_id == request.user.pk:
+        return follow_response(request, username, False)
+    # Повторная подписка ничего не меняет: гонку двух запросов разрешает
+    # ограничение unique_follow внутри get_or_create.
+    Follow.objects.get_or_create(user=request.user, author_id=author_id)
+    return follow_response(request, username, True)
 
 
 @login_required
+@require_POST
+@use_primary
 def profile_unfollow(request, username):
-    user = request.user
-    username = get_object_or_404(User, username=username)
-    following = Follow.objects.filter(user=user, author=username)
-    if following.exists():
-        following.delete()
-    context = {
-        'username': username,
-        'following': following,
-    }
-    context.update(paginator(request, username.posts.all()))
-    return render(request, 'posts/profile.html', context)
+    Follow.objects.filter(user=request.user,
+                          author__username=username).delete()
+    return follow_response(request, username, False)
+
+
+@login_required
+@require_POST
+@use_primary
+def follow_bulk(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or '{}')
+        except ValueError:
+            return HttpResponseBadRequest('Некорректный JSON')
+        if not isinstance(data, dict):
+            return HttpResponseBadRequest('Ожидается объект JSON')
+        follow = data.get('follow', [])
+        unfollow = data.get('unfollow', [])
+    else:
+        follow = request.POST.getlist('follow')
+        unfollow = request.POST.getlist('unfollow')
+    for usernames in (follow, unfollow):
+        if not isinstance(usernames, list) or not all(
+                isinstance(username, str) for username in usernames):
+            return HttpResponseBadRequest(
+                'follow и unfollow должны быть списками имён')
+    if len(follow) + len(unfollow) > FOLLOW_BULK_LIMIT:
+        return HttpResponseBadRequest(
+            f'Не больше {FOLLOW_BULK_LIMIT} авторов за запрос')
+    with transaction.atomic():
+        removed = dict(Follow.objects.filter(
+            user=request.user, author__username__in=unfollow
+        ).values_list('pk', 'author__username'))
+        Follow.objects.filter(pk__in=removed).delete()
+        authors = dict(User.objects.filter(username__in=follow).exclude(
+            pk=request.user.pk).values_list('pk', 'username'))
+        followed = set(Follow.objects.filter(
+            user=request.user, author_id__in=authors
+        ).values_list('author_id', flat=True))
+        # Подписки создаются по одной, чтобы сработали сигналы счётчиков,
+        # лент и кеша; уже существующие пропускаются одним запросом выше.
+        for author_id in authors.keys() - followed:
+            Follow.objects.create(user=request.user, author_id=author_id)
+    if wants_json(request):
+        return JsonResponse({
+            'following': sorted(authors.values()),
+            'unfollowed': sorted(set(removed.values())
+                                 - set(authors.values())),
+        })
+    return redirect('posts:follow_index')
+
+
+def feed_state(*namespaces):
+    # Ленты одинаковы для всех читателей, поэтому без id пользователя.
+    return tuple(get_versions(namespaces))
+
+
+def site_feed_state(request):
+    return feed_state('posts')
+
+
+def group_feed_state(request, slug):
+    return feed_state(f'group:{slug}')
+
+
+def author_feed_state(request, username):
+    return feed_state(f'author:{username}')
+
+
+def syndication(feed, state, namespace):
+    return conditional(state)(cached_page(namespace)(feed))
+
+
+feed_rss = syndication(PostsFeed(), site_feed_state, 'posts')
+feed_atom = syndication(PostsAtomFeed(), site_feed_state, 'posts')
+group_feed_rss = syndication(GroupPostsFeed(), group_feed_state,
+                             'group:{slug}')
+group_feed_atom = syndication(GroupPostsAtomFeed(), group_feed_state,
+                              'group:{slug}')
+author_feed_rss = syndication(AuthorPostsFeed(), author_feed_state,
+                              'author:{username}')
+author_feed_atom = syndication(AuthorPostsAtomFeed(), author_feed_state,
+                               'author:{username}')
@@ -0,0 +1,14 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+# Профиль настроек: dev (по умолчанию, разработка и тесты) или prod.
+YATUBE_ENV = os.environ.get('YATUBE_ENV', 'dev')
+
+if YATUBE_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif YATUBE_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f'Неизвестный профиль настроек YATUBE_ENV={YATUBE_ENV}')
@@ -0,0 +1,207 @@
+import os
+
+from ..databases import database_from_env, replicas_from_env
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+SECRET_KEY = '703*32-&m912!&7kq-xx#*r4!u0ct8*f5rac08h(9q!j$0mmt4'
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+]
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Страницы лент сбрасываются сигналами при изменении данных,
+# поэтому срок жизни можно держать большим.
+POSTS_CACHE_TIMEOUT = 60 * 60
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+INSTALLED_APPS = [
+    'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'core.apps.CoreConfig',
+    'users.apps.UsersConfig',
+    'posts.apps.PostsConfig',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'sorl.thumbnail',
+]
+
+MIDDLEWARE = [
+    'core.profiler.RequestProfilerMiddleware',
+    'core.db.ReplicaRoutingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+# Основная БД: YATUBE_DATABASE_URL (по умолчанию sqlite:///db.sqlite3),
+# YATUBE_DB_CONN_MAX_AGE — сколько секунд держать соединение между
+# запросами (0 — новое на каждый запрос), YATUBE_DB_POOLER=1 — перед БД
+# стоит пул соединений вроде PgBouncer.
+DATABASES = {
+    'default': database_from_env(os.environ, BASE_DIR),
+}
+# Перед запросом постоянное соединение проверяется и переоткрывается,
+# если БД его разорвала. Проверяются только соединения, простоявшие без
+# запросов дольше DATABASE_HEALTH_CHECK_IDLE секунд.
+DATABASE_HEALTH_CHECKS = os.environ.get(
+    'YATUBE_DB_HEALTH_CHECKS', '1') == '1'
+DATABASE_HEALTH_CHECK_IDLE = int(
+    os.environ.get('YATUBE_DB_HEALTH_CHECK_IDLE', '30'))
+# Выполняются при открытии каждого соединения с SQLite.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
+
+# Реплики для чтения: адреса БД через запятую, например
+# YATUBE_DB_REPLICAS=postgres://reader@replica1/yatube,postgres://... Локально
+# это копии SQLite (sqlite:///replica1.sqlite3), их наполняет команда
+# sync_replicas, в тестах реплики зеркалят основную БД.
+DATABASES.update(replicas_from_env(os.environ, BASE_DIR, DATABASES['default']))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+# Сколько секунд после записи пользователь читает с основной БД.
+REPLICA_STICKY_SECONDS = 10
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME':
+        'django.contrib.auth.password_validation.'
+        'UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.'
+        'MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.'
+        'CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.'
+        'NumericPasswordValidator',
+    },
+]
+
+LANGUAGE_CODE = 'ru'
+TIME_ZONE = 'UTC'
+USE_I18N = True
+USE_L10N = True
+USE_TZ = True
+STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+# LOGOUT_REDIRECT_URL = 'posts:index'
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Материализованная лента подписок (fan-out-on-write). Для авторов, у которых
+# подписчиков больше FEED_FANOUT_MAX_FOLLOWERS, лента собирается при чтении.
+FEED_FANOUT = False
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_BACKFILL_SIZE = 200
+
+# Миниатюры картинок постов создаются в фоновых потоках, пока картинка
+# не готова, в шаблоне показывается заглушка.
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+
+# Загруженные картинки сохраняются как posts/incoming-<uuid>, а пул потоков
+# уменьшает их, перекодирует без метаданных и кладёт по хешу содержимого,
+# так что одинаковые картинки занимают один файл.
+UPLOAD_ASYNC = True
+UPLOAD_WORKERS = 2
+UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+UPLOAD_MAX_PIXELS = 40_000_000
+UPLOAD_MAX_SIDE = 2560
+UPLOAD_IMAGE_FORMAT = 'WEBP'
+UPLOAD_IMAGE_QUALITY = 80
+
+# Отложенная запись комментариев: они копятся в буфере процесса и
+# записываются пачкой раз в COMMENTS_FLUSH_MS мс или по COMMENTS_FLUSH_SIZE
+# штук. Автор видит свой комментарий сразу, остальные — после записи.
+COMMENTS_WRITE_BEHIND = False
+COMMENTS_FLUSH_MS = 200
+COMMENTS_FLUSH_SIZE = 100
+
+# Поиск по постам: None — Fts5Backend для SQLite, LikeBackend для остальных
+# СУБД; путь к классу задаёт бэкенд явно.
+POSTS_SEARCH_BACKEND = None
+
+# Профилирование запросов: число и время SQL, время шаблонов, повторы SQL.
+# Замеры попадают в кольцевой буфер (страница core:profiler) и в лог.
+PROFILER_SAMPLE_RATE = 1.0
+PROFILER_SLOW_MS = 500
+PROFILER_BUFFER_SIZE = 1000
+PROFILER_LOG_FILE = os.path.join(BASE_DIR, 'profiler.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'profiler': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': PROFILER_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'core.profiler': {
+            'handlers': ['profiler'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,56 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import TEMPLATES
+
+
+def required(name):
+    try:
+        return os.environ[name]
+    except KeyError:
+        raise ImproperlyConfigured(f'Не задана переменная окружения {name}')
+
+
+DEBUG = False
+SECRET_KEY = required('YATUBE_SECRET_KEY')
+ALLOWED_HOSTS = required('YATUBE_ALLOWED_HOSTS').split(',')
+
+# Шаблоны читаются и компилируются один раз на процесс, отладочный
+# контекст (список SQL-запросов) не собирается.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'context_processors': [
+            processor
+            for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+            if processor != 'django.template.context_processors.debug'
+        ],
+        'loaders': [('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ])],
+    },
+}]
+
+# Статика с хешем содержимого в имени: браузеры кешируют её бессрочно.
+STATICFILES_STORAGE = (
+    'django.contrib.staticfiles.storage.ManifestStaticFilesStorage')
+
+# Общий для всех процессов кеш: версии страниц, реестр групп и миниатюры
+# должны совпадать у всех воркеров.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION',
+                                   '127.0.0.1:11211'),
+    }
+}
+
+# Профилировщик замеряет лишь малую долю запросов: подмена курсоров и
+# подсчёт SQL не должны замедлять каждый ответ.
+PROFILER_SAMPLE_RATE = float(
+    os.environ.get('YATUBE_PROFILER_SAMPLE_RATE', '0.01'))